@@ -0,0 +1,53 @@
+from wabbit_wappa.audit import *
+
+
+AUDIT_OUTPUT = ['0.214351 example_39',
+                '\ta^height:108232:1.5:0.0823@0.42\ta^height*b^red:4711:1.5:-0.01@0.42'
+                '\tConstant:116060:1:0.0154@0.71',
+                '-0.5',
+                '\t^word:22:1:-0.3\tb^red:4711:1:-0.02',
+                ]
+
+
+def test_parse_audit_token():
+    feature = parse_audit_token('a^height*b^red:4711:1.5:-0.01@0.42')
+    assert feature == AuditFeature('a*b', 'height*red', 4711, 1.5, -0.01)
+    feature = parse_audit_token('Constant:116060:1:0.0154')
+    assert feature == AuditFeature('', 'Constant', 116060, 1., 0.0154)
+    assert parse_audit_token('0.214351') is None
+    assert parse_audit_line('0.214351 example_39') is None
+
+
+def test_audit_records():
+    records = list(iter_audit_records(AUDIT_OUTPUT))
+    assert len(records) == 2
+    assert records[0].output == '0.214351 example_39'
+    assert [ feature.feature for feature in records[0].features ] == ['height',
+                                                                       'height*red',
+                                                                       'Constant']
+    assert records[1].features[0] == AuditFeature('', 'word', 22, 1., -0.3)
+
+
+def test_audit_index():
+    index = AuditIndex().update_from_lines(AUDIT_OUTPUT)
+    assert len(index) == 5
+    assert index.hash('a', 'height') == 108232
+    # Later weights replace earlier ones
+    assert index.weight('a*b', 'height*red') == -0.02
+    assert index.collisions() == {4711: set([('a*b', 'height*red'), ('b', 'red')])}
+    assert index.top(1) == [(('', 'word'), -0.3)]
+    assert index.prune_candidates(0.05) == [('', 'Constant'), ('a*b', 'height*red'), ('b', 'red')]
+
+
+def test_vw_audit_index():
+    from wabbit_wappa import VW
+    vw = VW(loss_function='logistic', audit=True)
+    for i in range(10):
+        # Audit lines don't shift the alignment of responses
+        result = vw.send_example(response=1., features=['a', 'b'])
+        assert result.prediction is not None
+    vw.sync()  # Reads off the audit lines of the last example
+    assert vw.audit_index.hash('', 'a') is not None
+    assert vw.audit_index.weight('', 'a') > 0
+    assert vw.get_prediction(['a', 'b']).prediction > 0
+    vw.close()
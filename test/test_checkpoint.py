@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+
+from wabbit_wappa import *
+from wabbit_wappa.checkpoint import Checkpointer
+
+
+def test_checkpointer():
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'model.vw')
+        vw = VW(loss_function='logistic')
+        checkpointer = Checkpointer(vw, filename, every_examples=10, keep=2)
+        for i in range(55):
+            vw.send_example(response=1., features=['a', 'b'])
+        # Snapshots before examples 11, 21, 31, 41 and 51; only the last two are kept
+        snapshots = checkpointer.snapshots()
+        assert [ os.path.basename(name) for name in snapshots ] == ['model.vw.000004',
+                                                                    'model.vw.000005']
+        assert not os.path.exists(filename + '.tmp')
+        assert len(checkpointer.save_seconds) == 5
+        # An explicit checkpoint is complete once wait() returns
+        checkpointer.checkpoint()
+        latest = checkpointer.wait()
+        assert latest == filename + '.000006'
+
+        # The snapshot can be loaded and gives the same predictions
+        vw2 = VW(loss_function='logistic', i=latest)
+        prediction1 = vw.get_prediction(['a', 'b']).prediction
+        prediction2 = vw2.get_prediction(['a', 'b']).prediction
+        assert prediction1 == prediction2
+        vw.close()
+        vw2.close()
+    finally:
+        shutil.rmtree(directory)
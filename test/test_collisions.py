@@ -0,0 +1,68 @@
+import random
+
+from wabbit_wappa import Namespace, VW
+from wabbit_wappa.hashing import hash_feature, hash_namespace, hash_quadratic
+from wabbit_wappa.collisions import *
+
+
+def test_parse_example_line():
+    vw = VW(dummy_mode=True)
+    line = vw.make_line(1., 2., tag='t',
+                        namespaces=[Namespace('alpha', 2., [('x', 1.5), 'y']),
+                                    Namespace(None, None, ['z'])])
+    namespaces = parse_example_line(line)
+    assert [ (n.name, n.scale, n.features) for n in namespaces ] == \
+        [('alpha', 2., [('x', 1.5), ('y', None)]), (None, None, [('z', None)])]
+
+
+def test_preview_hashes():
+    namespaces = [Namespace('alpha', features=['x']), Namespace('beta', features=['z'])]
+    x_hash = hash_feature('x', hash_namespace('alpha'))
+    z_hash = hash_feature('z', hash_namespace('beta'))
+    mask = (1 << 18) - 1
+    assert preview_hashes(namespaces, bits=18, quadratic=['ab']) == \
+        [('alpha^x', x_hash & mask), ('beta^z', z_hash & mask),
+         ('alpha^x*beta^z', hash_quadratic(x_hash, z_hash) & mask)]
+
+
+def test_expected_collisions():
+    assert expected_collisions(0, 18) == 0.
+    # Far more weights than features: almost no collisions
+    assert expected_collisions(100, 30) < 1e-3
+    # Twice as many features as weights: most slots are shared
+    m = 1 << 10
+    assert abs(expected_collisions(2 * m, 10) - (2 * m - m * (1 - 0.1353352832))) < 1e-3
+
+
+def test_hyperloglog():
+    random.seed(0)
+    sketch = HyperLogLog(precision=12)
+    for i in range(50000):
+        sketch.add(random.getrandbits(64))
+    assert abs(sketch.count() - 50000) / 50000 < 0.05
+    other = HyperLogLog(precision=12)
+    for i in range(50000):
+        other.add(random.getrandbits(64))
+    sketch.merge(other)
+    assert abs(sketch.count() - 100000) / 100000 < 0.05
+
+
+def test_collision_analyzer():
+    analyzer = CollisionAnalyzer(q='ab', tracked_bits=[4, 18], constant=False)
+    vw = VW(dummy_mode=True)
+    for i in range(200):
+        namespaces = [Namespace('a', features=['a{}'.format(i % 100)]),
+                      Namespace('b', features=['b{}'.format(i % 100), 'shared'])]
+        analyzer.add_line(vw.make_line(1., namespaces=namespaces))
+    # 100 'a' features, 101 'b' features and 200 crosses, each repeated
+    assert analyzer.examples == 200
+    assert analyzer.features == 200 * 5
+    distinct = analyzer.distinct_features()
+    assert abs(distinct - 401) < 10
+    report = dict((row['bits'], row) for row in analyzer.report())
+    # 16 weights can't hold 401 features; 2**18 almost always can
+    assert report[4]['occupied'] == 16
+    assert report[4]['collision_rate'] > 0.9
+    assert report[18]['observed_collisions'] < 10
+    assert report[18]['collision_rate'] < 0.001
+    assert analyzer.recommend_bits(0.01) == 15
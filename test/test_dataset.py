@@ -0,0 +1,47 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from wabbit_wappa import *
+from wabbit_wappa.dataset import DatasetWriter
+
+
+def read_lines(filename):
+    with gzip.open(filename, 'rb') as data_file:
+        return data_file.read().decode('UTF-8').splitlines()
+
+
+def test_dataset_writer():
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'train.vw')
+        # Small blocks, so that the output is many concatenated gzip members
+        with DatasetWriter(filename, shards=3, threads=2, block_size=100) as writer:
+            for i in range(1000):
+                writer.write_example(response=i % 2,
+                                     tag='example{}'.format(i),
+                                     features=[('a', i)])
+        assert writer.filenames == [ filename + '.{:05d}.gz'.format(shard) for shard in range(3) ]
+        lines = []
+        for shard_filename in writer.filenames:
+            shard_lines = read_lines(shard_filename)
+            assert shard_lines
+            lines.extend(shard_lines)
+        # Every example was written exactly once, as make_line() formats it
+        assert sorted(lines) == sorted(VW(dummy_mode=True).make_line(response=i % 2,
+                                                                     tag='example{}'.format(i),
+                                                                     features=[('a', i)])
+                                       for i in range(1000))
+        stats = writer.stats()
+        assert stats['examples'] == 1000
+        assert stats['examples_per_second'] > 0
+        assert stats['compression_ratio'] > 1
+
+        # Single, uncompressed file
+        with DatasetWriter(filename, compression=None) as writer:
+            writer.write_lines(['1 | a', '-1 | b'])
+        with open(filename) as data_file:
+            assert data_file.read() == '1 | a\n-1 | b\n'
+    finally:
+        shutil.rmtree(directory)
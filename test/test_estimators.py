@@ -0,0 +1,57 @@
+import pickle
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('scipy')
+
+from wabbit_wappa.estimators import VWClassifier, VWRegressor
+
+
+def make_data(num_rows=200):
+    X = np.zeros((num_rows, 3))
+    y = np.array(['neg', 'pos'] * (num_rows // 2))
+    for i, label in enumerate(y):
+        if label == 'pos':
+            X[i, 0] = 1 + random.random()
+        else:
+            X[i, 1] = 1 + random.random()
+        X[i, 2] = random.random()
+    return X, y
+
+
+def test_classifier():
+    X, y = make_data()
+    classifier = VWClassifier(vw_options={'b': 20})
+    classifier.fit(X, y)
+    assert list(classifier.classes_) == ['neg', 'pos']
+    assert (classifier.predict(X[:10]) == y[:10]).all()
+    probabilities = classifier.predict_proba(X[:10])
+    assert probabilities.shape == (10, 2)
+    assert np.allclose(probabilities.sum(axis=1), 1.)
+    assert ((probabilities[:, 1] > .5) == (y[:10] == 'pos')).all()
+
+    # Online training in batches
+    classifier2 = VWClassifier()
+    for start in range(0, len(y), 50):
+        classifier2.partial_fit(X[start:start + 50], y[start:start + 50], classes=['neg', 'pos'])
+    assert (classifier2.predict(X[:10]) == y[:10]).all()
+
+    # A pickled classifier makes the same predictions
+    classifier3 = pickle.loads(pickle.dumps(classifier))
+    assert np.array_equal(classifier3.decision_function(X[:10]),
+                          classifier.decision_function(X[:10]))
+    for estimator in [classifier, classifier2, classifier3]:
+        estimator.close()
+
+
+def test_regressor():
+    X, y = make_data()
+    target = np.where(y == 'pos', 3., -3.)
+    regressor = VWRegressor(passes=3)
+    regressor.fit(X, target)
+    predictions = regressor.predict(X[:10])
+    assert predictions.shape == (10,)
+    assert ((predictions > 0) == (target[:10] > 0)).all()
+    regressor.close()
@@ -0,0 +1,43 @@
+from wabbit_wappa import Namespace
+from wabbit_wappa.hashing import *
+
+
+def test_murmurhash3():
+    # Reference values for MurmurHash3_x86_32
+    assert murmurhash3_32('', 0) == 0
+    assert murmurhash3_32('', 1) == 0x514e28b7
+    assert murmurhash3_32('hello', 0) == 0x248bfa47
+    assert murmurhash3_32('The quick brown fox jumps over the lazy dog', 0) == 0x2e4ff723
+    assert murmurhash3_32(b'\xff\xff\xff\xff', 0) == 0x76293b50
+
+
+def test_hash_string():
+    # Numeric feature names are added to the seed rather than hashed
+    assert hash_string('123', 5) == 128
+    assert hash_string('a123', 5) == murmurhash3_32('a123', 5)
+    assert hash_namespace(None) == 0
+    assert hash_namespace('space1') == murmurhash3_32('space1', 0)
+    # The constant feature lands at VW's familiar index for -b 18
+    assert CONSTANT_HASH & ((1 << 18) - 1) == 116060
+
+
+def test_example_hashes():
+    namespaces = [Namespace('alpha', 2., [('x', 1.5), 'y']),
+                  Namespace('beta', features=['z'])]
+    alpha_hash = hash_namespace('alpha')
+    beta_hash = hash_namespace('beta')
+    hashes = list(iter_example_hashes(namespaces, quadratic=quadratic_specs(q='ab')))
+    x_hash = hash_feature('x', alpha_hash)
+    y_hash = hash_feature('y', alpha_hash)
+    z_hash = hash_feature('z', beta_hash)
+    assert hashes == [(x_hash, 3.), (y_hash, 2.), (z_hash, 1.),
+                      (hash_quadratic(x_hash, z_hash), 3.),
+                      (hash_quadratic(y_hash, z_hash), 2.)]
+    # 'a' crossed with every namespace present, including itself
+    assert quadratic_specs(q_colon='a') == ['a:']
+    assert len(list(iter_example_hashes(namespaces, quadratic=['a:']))) == 3 + 4 + 2
+    # With names, in VW's audit format
+    named = list(iter_example_hashes(namespaces, quadratic=['ab'], names=True))
+    assert [ name for name, feature_hash, value in named ] == \
+        ['alpha^x', 'alpha^y', 'beta^z', 'alpha^x*beta^z', 'alpha^y*beta^z']
+    assert [ (feature_hash, value) for name, feature_hash, value in named ] == hashes
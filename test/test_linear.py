@@ -0,0 +1,68 @@
+import os
+import random
+import shutil
+import tempfile
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from wabbit_wappa import *
+from wabbit_wappa import hashing
+from wabbit_wappa.linear import LinearModel, load_readable_model
+
+
+def test_load_readable_model():
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'model.txt')
+        space_hash = hashing.hash_namespace('space')
+        x_index = hashing.hash_feature('x', space_hash) & 1023
+        with open(filename, 'w') as model_file:
+            model_file.write('Version 7.7.0\n'
+                             'Min label:-1.000000\n'
+                             'Max label:1.000000\n'
+                             'bits:10\n'
+                             '0 pairs: \n'
+                             '0 triples: \n'
+                             'rank:0\n'
+                             'lda:0\n'
+                             '0 ngram: \n'
+                             '0 skip: \n'
+                             'options:\n'
+                             ':0\n'
+                             'space^x:{}:0.25\n'
+                             'Constant:{}:0.1\n'.format(x_index,
+                                                        hashing.CONSTANT_HASH & 1023))
+        model = load_readable_model(filename)
+        assert model.bits == 10
+        assert model.score([Namespace('space', features=[('x', 2.)])]) == pytest.approx(0.6)
+        # Predictions are clipped to the label range
+        scores = model.score_batch([[Namespace('space', features=[('x', 8.)])],
+                                    [Namespace('other', features=['y'])]])
+        assert scores == pytest.approx([1., 0.1])
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_parity_with_vw():
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'model.txt')
+        vw = VW(loss_function='squared', b=16, q=['ab'], readable_model=filename)
+        examples = []
+        for i in range(100):
+            namespaces = [Namespace('alpha', features=[('x', random.random()),
+                                                       'w{}'.format(random.randint(0, 20))]),
+                          Namespace('beta', 0.5, [('y', random.random()), '17'])]
+            examples.append(namespaces)
+            vw.send_example(response=random.random(), namespaces=namespaces)
+        predictions = [ vw.get_prediction(namespaces=namespaces).prediction
+                        for namespaces in examples[:20] ]
+        vw.close()  # VW writes the readable model on exit
+        model = load_readable_model(filename)
+        assert model.quadratic == ['ab']
+        # VW prints predictions with six decimal places
+        assert model.score_batch(examples[:20]) == pytest.approx(predictions, abs=1e-5)
+    finally:
+        shutil.rmtree(directory)
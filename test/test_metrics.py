@@ -0,0 +1,50 @@
+import math
+import random
+
+import pytest
+
+from wabbit_wappa import *
+from wabbit_wappa.metrics import OnlineMetrics
+
+
+def test_online_metrics():
+    metrics = OnlineMetrics()
+    assert metrics.auc is None
+    pairs = [(1, 2.), (1, 1.), (-1, -1.), (-1, 1.5), (1, -2.)]
+    for label, prediction in pairs:
+        metrics.update(label, prediction)
+    assert metrics.count == 5
+    expected_log_loss = sum(math.log(1 + math.exp(-label * prediction))
+                            for label, prediction in pairs) / len(pairs)
+    assert metrics.log_loss == pytest.approx(expected_log_loss)
+    # Squared loss is the Brier score of the predicted probabilities
+    expected_squared_loss = sum(((label > 0) - 1. / (1 + math.exp(-prediction))) ** 2
+                                for label, prediction in pairs) / len(pairs)
+    assert metrics.squared_loss == pytest.approx(expected_squared_loss)
+    # 3 of the 6 (positive, negative) pairs are ordered correctly
+    assert metrics.auc == pytest.approx(0.5)
+    assert len(metrics.calibration_curve()) == 5
+
+
+def test_windowed_metrics():
+    metrics = OnlineMetrics(link='identity', threshold=0.5, window=2)
+    metrics.update(1, 0.1, importance=3.)
+    metrics.update(0, 0.2)
+    metrics.update(1, 0.9)
+    # Only the last two examples count
+    assert metrics.count == 2
+    assert metrics.auc == pytest.approx(1.)
+    assert metrics.squared_loss == pytest.approx((0.2 ** 2 + 0.1 ** 2) / 2)
+
+
+def test_progressive_validation():
+    vw = VW(loss_function='logistic', metrics=OnlineMetrics())
+    for i in range(200):
+        if random.random() > 0.5:
+            vw.send_example(1., features=['a', 'b'])
+        else:
+            vw.send_example(response=-1., features=['c', 'd'], parse_result=False)
+    vw.get_prediction(['a'])  # Unlabeled examples are not counted
+    assert vw.metrics.count == 200
+    assert vw.metrics.auc > 0.9
+    vw.close()
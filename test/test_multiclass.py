@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from wabbit_wappa import *
+from wabbit_wappa.multiclass import parse_scores, parse_score_matrix, top_k
+
+
+def test_parse_scores():
+    row = parse_scores(b'1:0.5 2:-1.25 4:3', n_classes=4)
+    assert np.allclose(row[[0, 1, 3]], [0.5, -1.25, 3.])
+    assert np.isnan(row[2])
+    # Tags are ignored
+    assert np.allclose(parse_scores('2:1 1:2 example_39', n_classes=2), [2., 1.])
+
+
+def test_score_matrix():
+    outputs = ['1:0.1 2:0.7 3:0.2', '1:0.9 2:0.05 3:0.05 tag']
+    scores = parse_score_matrix(outputs, 3)
+    assert np.allclose(scores, [[0.1, 0.7, 0.2], [0.9, 0.05, 0.05]])
+    # Ragged output and lost responses fall back to row-by-row parsing
+    out = np.zeros((3, 3))
+    parse_score_matrix(['1:1', '2:2 3:3', None], 3, out=out)
+    assert np.allclose(out, [[1., 0., 0.], [0., 2., 3.], [0., 0., 0.]])
+
+    labels, best = top_k(scores, 2)
+    assert labels.tolist() == [[2, 3], [1, 2]]
+    assert np.allclose(best, [[0.7, 0.2], [0.9, 0.05]])
+    labels, best = top_k(scores, 1, largest=False)
+    assert labels.tolist() == [[1], [2]]
+
+
+def test_predict_multiclass():
+    vw = VW(oaa=3, predictions='/dev/null', raw_predictions='/dev/stdout')
+    for i in range(300):
+        label = random.randint(1, 3)
+        vw.send_example(response=label, features=['f{}'.format(label)])
+    lines = [ vw.make_line(features=['f{}'.format(label)]) for label in [1, 2, 3] ]
+    scores = vw.predict_multiclass(lines, 3)
+    assert scores.shape == (3, 3)
+    assert scores.argmax(axis=1).tolist() == [0, 1, 2]
+    labels, best = vw.predict_multiclass(lines, 3, k=1)
+    assert labels[:, 0].tolist() == [1, 2, 3]
+    vw.close()
@@ -0,0 +1,100 @@
+import random
+import sys
+
+import pytest
+
+from wabbit_wappa import *
+from wabbit_wappa.pipeline import Pipeline, serialize_example
+
+
+def featurize(number):
+    return {'response': 1. if number % 2 else -1.,
+            'features': ['odd' if number % 2 else 'even']}
+
+
+def test_pipeline_stages():
+    results = []
+    pipeline = Pipeline(range(1000), buffer_size=10)
+    pipeline.featurize(featurize, workers=3)
+    pipeline.serialize(workers=2, mode='process')
+    pipeline.add_stage('filter', lambda line: line if line.startswith('1') else None)
+    pipeline.sink(results.append)
+    stats = pipeline.run()
+    # Multiple workers may reorder items, but none are lost
+    assert sorted(results) == sorted(serialize_example(featurize(i)) for i in range(1, 1000, 2))
+    assert [ stage['name'] for stage in stats ] == ['featurize', 'serialize', 'filter']
+    assert stats[0]['items_in'] == 1000
+    assert stats[2]['items_out'] == 500
+    for stage in stats:
+        assert 0. <= stage['mean_occupancy'] <= 1.
+        assert stage['items_per_second'] > 0
+
+
+def drop_multiples_of_three(number):
+    if number % 3:
+        return number
+    return None
+
+
+def test_process_batches():
+    # Batches smaller than the number of items, and a final partial one
+    results = []
+    pipeline = Pipeline(range(1000), buffer_size=10)
+    pipeline.add_stage('drop', drop_multiples_of_three, workers=2, mode='process', chunk_size=7)
+    pipeline.sink(results.append)
+    stats = pipeline.run()
+    assert sorted(results) == [ i for i in range(1000) if i % 3 ]
+    assert stats[0]['items_in'] == 1000
+    assert stats[0]['items_out'] == len(results)
+    assert stats[0]['busy_seconds'] >= 0.
+
+
+def test_threaded_serialize():
+    # Each line must hold exactly its own example's features
+    def make_example(number):
+        return {'response': 1., 'features': ['f{}'.format(number), 'g{}'.format(number)]}
+    results = []
+    pipeline = Pipeline(range(20000), buffer_size=100)
+    pipeline.serialize(lambda number: serialize_example(make_example(number)), workers=4)
+    pipeline.sink(results.append)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads often, to expose any races
+    try:
+        pipeline.run()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert sorted(results) == sorted('1.0 | f{0} g{0} '.format(i) for i in range(20000))
+
+
+def test_pipeline_error():
+    def fail(item):
+        if item == 50:
+            raise ValueError(item)
+        return item
+    pipeline = Pipeline(range(100), buffer_size=5).add_stage('fail', fail)
+    with pytest.raises(ValueError):
+        pipeline.run()
+
+
+def fail_on_fifty(item):
+    if item == 50:
+        raise ValueError(item)
+    return item
+
+
+def test_process_error():
+    pipeline = Pipeline(range(100), buffer_size=5)
+    pipeline.add_stage('fail', fail_on_fifty, mode='process', chunk_size=4)
+    with pytest.raises(ValueError):
+        pipeline.run()
+
+
+def test_pipeline_vw():
+    vw = VW(loss_function='logistic')
+    results = []
+    examples = [ random.randint(0, 100) for i in range(500) ]
+    pipeline = Pipeline(examples).featurize(featurize).serialize().vw(vw).sink(results.append)
+    pipeline.run()
+    assert len(results) == 500
+    assert vw.get_prediction(['odd']).prediction > 0
+    vw.close()
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+scipy_sparse = pytest.importorskip('scipy.sparse')
+
+from wabbit_wappa import *
+from wabbit_wappa import sparse
+
+
+def test_sparse_lines():
+    X = scipy_sparse.csr_matrix(np.array([[1, 0, 2.5, 0],
+                                          [0, 0, 0, 0],
+                                          [0, 3, 0, 1]]))
+    lines = list(sparse.iter_sparse_lines(X,
+                                          y=[1, -1, 1],
+                                          column_names=['a', 'b c', 'd', 'e'],
+                                          namespace_map={'ns': ['d', 3]},
+                                          chunk_size=2))
+    assert lines == ['1 | a:1.0 |ns d:2.5 ',
+                     '-1 |',
+                     '1 | b\\_c:3.0 |ns e:1.0 ']
+    # Unlabeled lines, with column indices as feature names
+    lines = list(sparse.iter_sparse_lines(X, sample_weight=[2, 2, 2]))
+    assert lines == ['| 0:1.0 2:2.5 ', '|', '| 1:3.0 3:1.0 ']
+    # A namespace covering every column, out of order
+    lines = list(sparse.iter_sparse_lines(scipy_sparse.csr_matrix([[1., 2.]]),
+                                          column_names=['a', 'b'],
+                                          namespace_map={'n': [1, 0]}))
+    assert len(lines) == 1 and lines[0].startswith('|n ')
+    assert sorted(lines[0][3:].split()) == ['a:1.0', 'b:2.0']
+
+
+def test_dataframe_lines():
+    pd = pytest.importorskip('pandas')
+    df = pd.DataFrame({'height': [1.5, 0.], 'width': [0., 2.]})
+    lines = list(sparse.iter_sparse_lines(df, y=[1, -1]))
+    assert lines == ['1 | height:1.5 ', '-1 | width:2.0 ']
+    # Columns whose names need escaping can be mapped by their real names
+    df = pd.DataFrame({'user age': [30., 0.], 'id': [1., 2.]})
+    lines = list(sparse.iter_sparse_lines(df, namespace_map={'u': ['user age']}))
+    assert lines == ['| id:1.0 |u user\\_age:30.0 ', '| id:2.0 ']
+
+
+def test_fit_sparse():
+    rows = []
+    labels = []
+    for i in range(200):
+        label = random.choice([-1, 1])
+        if label > 0:
+            rows.append([1 + random.random(), 0, 0])
+        else:
+            rows.append([0, 1 + random.random(), 0])
+        labels.append(label)
+    X = scipy_sparse.csr_matrix(np.array(rows))
+    vw = VW(loss_function='logistic')
+    vw.fit_sparse(X, labels, namespace_map={'space1': [0, 1]}, chunk_size=64)
+    predictions = vw.predict_sparse(X[:10], namespace_map={'space1': [0, 1]})
+    assert isinstance(predictions, np.ndarray)
+    assert predictions.shape == (10,)
+    assert ((predictions > 0) == (np.array(labels[:10]) > 0)).all()
+    # Predictions agree with the one-at-a-time interface
+    prediction = vw.get_prediction(namespaces=[Namespace('space1',
+                                                         features=[('0', rows[0][0])])]).prediction
+    assert prediction == pytest.approx(vw.predict_sparse(X[:1],
+                                                         namespace_map={'space1': [0, 1]})[0])
+    vw.close()
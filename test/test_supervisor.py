@@ -0,0 +1,65 @@
+from wabbit_wappa import *
+from wabbit_wappa.supervisor import (VWSupervisor, WabbitResourceError, command_options,
+                                     estimate_memory, DEFAULT_OVERHEAD_BYTES)
+
+
+def test_estimate_memory():
+    assert estimate_memory(b=18) == (1 << 18) * 4 * 4 + DEFAULT_OVERHEAD_BYTES
+    assert estimate_memory(b=18, sgd=True) == (1 << 18) * 4 + DEFAULT_OVERHEAD_BYTES
+    # Reductions round the number of problems up to a power of two
+    assert estimate_memory(b=18, oaa=3) == estimate_memory(b=18, oaa=4)
+    assert estimate_memory(b=18, oaa=4) > estimate_memory(b=18)
+    # Unrelated options are ignored
+    assert estimate_memory(b=18, loss_function='logistic') == estimate_memory(b=18)
+
+
+def test_command_options():
+    assert command_options('vw -b 24 --oaa=10 --sgd --quiet') == dict(b='24', oaa='10', sgd=True)
+    assert command_options(['vw', '--bit_precision', '20']) == dict(b='20')
+    assert estimate_memory(**command_options('vw -b 20')) == estimate_memory(b=20)
+    # Options given as VW() keyword arguments map to the same names
+    assert command_options(make_command_args(bit_precision=30, oaa=3, sgd=True)) == \
+        dict(b='30', oaa='3', sgd=True)
+
+
+def test_spawn_estimate():
+    supervisor = VWSupervisor(max_rss_bytes=1 << 30)
+    for kwargs in (dict(b=30), dict(bit_precision=30), dict(b=24, oaa=100)):
+        try:
+            supervisor.spawn(**kwargs)
+            assert False, "Expected WabbitResourceError for {}".format(kwargs)
+        except WabbitResourceError:
+            pass
+    assert not supervisor.children
+
+
+def test_supervisor():
+    supervisor = VWSupervisor(cpus=[0], max_rss_bytes=1 << 30)
+    try:
+        try:
+            supervisor.spawn(b=30)
+            assert False, "Expected WabbitResourceError"
+        except WabbitResourceError:
+            pass
+        vw = supervisor.spawn(b=18, loss_function='logistic')
+        vw.send_example(response=1., features=['a'])
+        usage = supervisor.usage(vw)
+        assert usage['rss_bytes'] > 0
+        assert usage['cpus'] == set([0])
+        old_pid = usage['pid']
+        supervisor.restart(vw)
+        assert supervisor.usage(vw)['pid'] != old_pid
+        assert vw.get_prediction(['a']).prediction is not None
+        # -b given in a command is taken into account
+        try:
+            supervisor.spawn(command='vw -b 30 --quiet')
+            assert False, "Expected WabbitResourceError"
+        except WabbitResourceError:
+            pass
+        # A closed child is no longer supervised (or restarted)
+        vw.close()
+        assert vw not in supervisor.children
+        supervisor.check()
+        assert supervisor.restarts == 1
+    finally:
+        supervisor.close()
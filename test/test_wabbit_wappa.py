@@ -1,8 +1,12 @@
 
 import random
 import os
+import subprocess
+import sys
 import time
 
+import pytest
+
 from wabbit_wappa import *
 
 
@@ -56,6 +60,68 @@ def test_command():
     vw = VW(command)
 
 
+def test_command_args():
+    args = make_command_args(b=20,
+                             q=['ab', 'bc'],
+                             f='my model.vw',
+                             adaptive=False,
+                             )
+    assert args[0] == 'vw'
+    assert args[args.index('-b') + 1] == '20'
+    assert args.count('-q') == 2
+    # Arguments with spaces stay intact, and are quoted in the command line
+    assert args[args.index('-f') + 1] == 'my model.vw'
+    assert "-f 'my model.vw'" in make_command_line(f='my model.vw')
+    # False flags are left out
+    assert '--adaptive' not in args
+    # VW runs directly from the argument list
+    vw = VW(args)
+    assert vw.command_args == args
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="Lazy imports and -X importtime need Python 3.7")
+def test_lazy_imports():
+    # Generating VW input shouldn't pull in the process and socket machinery
+    code = ("import wabbit_wappa; "
+            "wabbit_wappa.make_command_line(b=20); "
+            "wabbit_wappa.VW(dummy_mode=True).make_line(1., features=['a'])")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    modules = set(line.rsplit('|', 1)[-1].strip() for line in result.stderr.splitlines()
+                  if line.startswith('import time:'))
+    assert 'wabbit_wappa' in modules
+    for module in ('pexpect', 'socket', 'logging', 'wabbit_wappa.active_learner', 'numpy'):
+        assert module not in modules, module
+    # Submodules still load on attribute access
+    import wabbit_wappa
+    assert wabbit_wappa.active_learner.DEFAULT_PORT
+    assert wabbit_wappa.hashing.murmurhash3_32(b'') == 0
+
+
+def test_process_pool():
+    from wabbit_wappa.pool import VWProcessPool
+    pool = VWProcessPool(size=2, refill=False)
+    args = make_command_args(loss_function='logistic')
+    pool.prespawn(args)
+    vw = VW(loss_function='logistic', process_pool=pool)
+    assert pool.stats()['hits'] == 1
+    assert pool.stats()['idle'] == 1
+    vw.send_example(response=1., features=['a'])
+    assert vw.get_prediction(['a']).prediction > 0
+    vw.close()
+    pool.close()
+
+
+def test_pool_key():
+    from wabbit_wappa.pool import pool_key
+    # Option order doesn't matter, but values stay with their options
+    assert pool_key(make_command_args(b=20, l=.5)) == pool_key(make_command_args(l=.5, b=20))
+    assert pool_key(['vw', '-b', '20', '-l', '0.5']) != pool_key(['vw', '-b', '0.5', '-l', '20'])
+    assert pool_key(['vw', '--l1', '-0.5', '-q', 'ab']) == pool_key(['vw', '-q', 'ab', '--l1', '-0.5'])
+
+
 def test_training():
     # TODO: pytest probably has a framework for testing hyperparameters like this
     for active_mode in [False, True]:
@@ -137,3 +203,45 @@ def test_training():
         vw.close()
         vw2.close()
         os.remove(filename)
+
+
+def test_sequence_tags():
+    vw = VW(loss_function='logistic', sequence_tags=True)
+    for i in range(10):
+        result = vw.send_example(response=1., features=['a'])
+        assert result.prediction is not None
+        # Responses echo the generated sequence tag
+        assert b'ww_' in result.raw_output or 'ww_' in result.raw_output
+    # Save commands produce no response, but don't shift alignment
+    vw.save_model('__temp.model')
+    results = vw.send_lines(['1 | a', "-1 'mine| b", '| a'])
+    assert [ result.raw_output.split()[1] for result in results ][1] in (b'mine', 'mine')
+    assert results[2].prediction > 0
+    assert not vw.framing_errors
+    # Save commands sent as lines are passed through untagged
+    results = vw.send_lines(['1 | a', 'save___temp2.model|', '1 | b'])
+    assert results[1] is None
+    assert results[0].prediction is not None and results[2].prediction is not None
+    vw.sync()
+    assert os.path.exists('__temp2.model')
+    assert not vw.framing_errors
+    vw.close()
+    os.remove('__temp.model')
+    os.remove('__temp2.model')
+
+
+def test_tag_line():
+    vw = VW(dummy_mode=True, sequence_tags=True)
+    line, tag = vw._tag_line('1 | a')
+    assert line == "1 'ww_1| a" and tag == 'ww_1'
+    # Commands are left alone and get no response
+    line, tag = vw._tag_line('save_x|')
+    assert line == 'save_x|' and tag is not None and tag not in ('x', 'save_x')
+    # Existing tags, quoted or unquoted, are kept
+    assert vw._tag_line("1 'mine| a") == ("1 'mine| a", 'mine')
+    assert vw._tag_line('1 mytag| a') == ('1 mytag| a', 'mytag')
+    line, tag = vw._tag_line('1 mytag | a')
+    assert line == '1 mytag | a'
+    # Numeric importance and cost-sensitive labels aren't tags
+    assert vw._tag_line('1 2.0 | a')[0] == "1 2.0 'ww_2| a"
+    assert vw._tag_line('1:0.5 2:1 | a')[0] == "1:0.5 2:1 'ww_3| a"
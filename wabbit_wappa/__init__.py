@@ -11,7 +11,6 @@ TODO:
     (This would make good example code also.)
     -Abstraction for passes (with automatic usage of example cache)
 -Example for README: Active learning interface
--Sklearn compatibility (like vowpal_porpoise)
 
 
 by Michael J.T. O'Kelly, 2014-2-24
@@ -26,12 +25,63 @@ try:
 except:
     basestring = str
 
-import logging
+import collections
+import importlib
 import re
+import sys
+import time
+
+try:
+    from shlex import quote as shell_quote
+except ImportError:  # Python 2
+    from pipes import quote as shell_quote
+import shlex
+
+# pexpect, logging and the active_learner module (with its sockets) are
+# imported on first use, so that scripts which only generate VW input
+# (make_command_line(), Namespace, make_line()) start quickly.
+
+
+DEFAULT_CHUNK_SIZE = 128  # Lines written to VW at once when pipelining
+DEFAULT_RESYNC_TIMEOUT = 5.  # Seconds to wait for a response before probing VW
+SEQUENCE_TAG_PREFIX = 'ww_'
+COMMAND_PREFIX = 'save_'  # Lines like 'save_<filename>|' are commands; VW doesn't respond
+
+_NO_RESPONSE = object()  # Stands in for the tag of a line VW won't respond to
+
+
+class _NoLock():
+    """Stand-in for a lock, for VW instances used from a single thread."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NO_LOCK = _NoLock()
+
+# Submodules loaded on first attribute access (Python 3.7+), e.g. wabbit_wappa.active_learner
+LAZY_SUBMODULES = frozenset(['active_learner', 'audit', 'checkpoint', 'collisions', 'dataset',
+                             'estimators', 'hashing', 'linear', 'metrics', 'multiclass',
+                             'pipeline', 'pool', 'sparse', 'supervisor'])
+
+
+def __getattr__(name):
+    if name in LAZY_SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
-import pexpect
 
-from . import active_learner
+if sys.version_info < (3, 7):  # No module __getattr__ (PEP 562); import eagerly as before
+    from . import active_learner
+
+
+def _logging():
+    """Return the logging module, importing it only when there is
+    something to log."""
+    import logging
+    return logging
+
 
 class WabbitInvalidCharacter(ValueError):
     pass
@@ -63,6 +113,20 @@ def escape_vw_string(s):
     return escaped_s
 
 
+def is_command_line(line):
+    """Return True if 'line' is a VW command (such as a save_model() request)
+    rather than an example; VW sends no response to commands."""
+    return line.lstrip().startswith(COMMAND_PREFIX)
+
+
+def _is_number(token):
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+
 class Namespace():
     """Abstraction of Namespace part of VW example lines"""
     def __init__(self,
@@ -178,15 +242,15 @@ class VWResult():
         an Active Learning context."""
         self.raw_output = result_string
         result_list = []
-        # TODO: Something more robust than whitespace splitting
-        #   to handle modes like --audit ?
+        # NOTE: --audit output spans several lines per example; VW(audit=True)
+        #   diverts the audit lines into vw.audit_index instead
         for token in result_string.split():
             try:
                 result = float(token)
                 result_list.append(result)
             except ValueError:
                 # Ignore tokens that can't be made into floats (like tags)
-                logging.debug("Ignoring non-float token {}".format(token))
+                _logging().debug("Ignoring non-float token {}".format(token))
         self.value_list = result_list
         if result_list:
             self.prediction = result_list[0]
@@ -204,8 +268,19 @@ class VWResult():
 
 class VW():
     """Wrapper for VW executable, handling online input and outputs."""
-    def __init__(self, command=None, active_mode=False, dummy_mode=False, **kwargs):
-        """'command' is the full command-line necessary to run VW.  E.g.
+    def __init__(self,
+                 command=None,
+                 active_mode=False,
+                 dummy_mode=False,
+                 process_pool=None,
+                 metrics=None,
+                 sequence_tags=False,
+                 resync_timeout=DEFAULT_RESYNC_TIMEOUT,
+                 preexec_fn=None,
+                 audit_index=None,
+                 **kwargs):
+        """'command' is the full command-line necessary to run VW, either as
+        a string or (preferably) as an argument list.  E.g.
         vw --loss_function logistic -p /dev/stdout --quiet
         -p /dev/stdout --quiet is mandatory for compatibility,
         and certain options like 
@@ -220,11 +295,38 @@ class VW():
             a simulated subprocess.
         dummy_mode: Don't actually start any VW process.  (Used for assembling
             VW command lines separately.)
+        process_pool: A pool.VWProcessPool from which to take an already-running
+            VW process with the same arguments, if one is available.
+            (Not used in active_mode.)
+        metrics: A metrics.OnlineMetrics object, which will be updated with the
+            label and (pre-update) prediction of every labeled example sent.
+        sequence_tags: Tag every example line that has no tag of its own with
+            a sequence number, and check that each response echoes the tag of
+            the line it answers.  Stray output lines are skipped, and lines
+            whose responses never arrive get a None result; both are counted
+            in self.framing_errors.
+        resync_timeout: With sequence_tags, the number of seconds to wait for
+            a response before sending VW a probe example to find out which
+            responses are missing.
+        preexec_fn: A function called in the child process just before VW is
+            executed (e.g. to set CPU affinity or rlimits; see
+            supervisor.VWSupervisor).  (Not used with a process_pool.)
+        audit_index: An audit.AuditIndex to update with the features and
+            weights VW reports when run with --audit (one is created if
+            audit=True is given).  The audit lines following each response
+            are read off before the next response, so call sync() to make
+            sure the index covers every example sent.  (Not used in
+            active_mode.)
 
         If no command is given, any additional keyword arguments are passed to
-            make_command_line() and the resulting command is used.  (This provides
+            make_command_args() and the resulting command is used.  (This provides
             sensible defaults.)
+
+        The VW process is executed directly from its argument list,
+        without any shell parsing.
         """
+        if active_mode:
+            from . import active_learner
         if command is None:
             if active_mode:
                 active_settings = active_learner.get_active_default_settings()
@@ -232,46 +334,262 @@ class VW():
                 active_settings.update(kwargs)
                 kwargs = active_settings
                 port = kwargs.get('port')
-            command = make_command_line(**kwargs)
+            command = make_command_args(**kwargs)
+        if isinstance(command, basestring):
+            command_args = shlex.split(command)
+        else:
+            command_args = list(command)
+            command = join_command_args(command_args)
         self.active_mode = active_mode
         self.dummy_mode = dummy_mode
+        start_time = time.time()
         if dummy_mode:
             self.vw_process = None
         else:
             if active_mode:
-                self.vw_process = active_learner.ActiveVWProcess(command, port=port)
+                self.vw_process = active_learner.ActiveVWProcess(command_args, port=port,
+                                                                 preexec_fn=preexec_fn)
+            elif process_pool is not None:
+                self.vw_process = process_pool.acquire(command_args)
             else:
-                self.vw_process = pexpect.spawn(command)
-                # Turn off delaybeforesend; this is necessary only in non-applicable cases
-                self.vw_process.delaybeforesend = 0
-                self.vw_process.setecho(False)
-        logging.info("Started VW({})".format(command))
+                self.vw_process = spawn_vw_process(command_args, preexec_fn=preexec_fn)
+        self.startup_seconds = time.time() - start_time
+        if not dummy_mode:
+            _logging().info("Started VW({}) in {:.4f}s".format(command, self.startup_seconds))
         self.command = command
+        self.command_args = command_args
         self.namespaces = []
         self._line = None
+        self.checkpointer = None  # Set by checkpoint.Checkpointer
+        self.supervisor = None  # Set by supervisor.VWSupervisor
+        # Held while talking to the process; a supervisor replaces this with
+        # a real lock, so that it never restarts the process mid-exchange
+        self.process_lock = _NO_LOCK
+        if (audit_index is None and not dummy_mode and not active_mode
+                and ('--audit' in command_args or '-a' in command_args)):
+            from . import audit
+            audit_index = audit.AuditIndex()
+        self.audit_index = audit_index
+        self.metrics = metrics
+        self.sequence_tags = sequence_tags
+        self.resync_timeout = resync_timeout
+        self.framing_errors = collections.Counter()
+        self._sequence = 0
 
     def send_line(self, line, parse_result=True):
         """Submit a raw line of text to the VW instance, returning a 
         VWResult() object.
 
         If 'parse_result' is False, ignore the result and return None.
+        (None is also returned if the response was lost, with sequence_tags.)
         """
-        self.vw_process.sendline(line)  # Send line, along with newline
-        result = self._get_response(parse_result=parse_result)
-        return result
-
-    def _get_response(self, parse_result=True):
-        """If 'parse_result' is False, ignore the received output and return None."""
+        output = self._send_line_raw(line)
+        if parse_result and output is not None:
+            return VWResult(output, active_mode=self.active_mode)
+        else:
+            return None
+
+    def _send_line_raw(self, line):
+        """Submit a line and return VW's unparsed response
+        (None for commands, which get no response)."""
+        if self.sequence_tags:
+            return self._send_chunk([line])[0]
+        with self.process_lock:
+            if is_command_line(line):
+                self.vw_process.sendline(line)
+                return None
+            if self.checkpointer is not None:
+                self.checkpointer.before_example()
+            self.vw_process.sendline(line)  # Send line, along with newline
+            return self._read_response()
+
+    def send_lines(self, lines, parse_result=True, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Submit an iterable of raw lines to the VW instance, pipelined:
+        each chunk of 'chunk_size' lines is written at once before its
+        responses are read back.  Returns a list of VWResult objects, in
+        the order of 'lines'.
+
+        If 'parse_result' is False, ignore the results and return None.
+        """
+        results = []
+        for output in self._send_lines_raw(lines, chunk_size=chunk_size):
+            if parse_result:
+                if output is None:
+                    results.append(None)
+                else:
+                    results.append(VWResult(output, active_mode=self.active_mode))
+        if parse_result:
+            return results
+        else:
+            return None
+
+    def _send_lines_raw(self, lines, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Generator underlying send_lines(), yielding the unparsed
+        output for each line."""
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                for output in self._send_chunk(chunk):
+                    yield output
+                chunk = []
+        if chunk:
+            for output in self._send_chunk(chunk):
+                yield output
+
+    def _send_chunk(self, chunk):
+        with self.process_lock:
+            if self.sequence_tags:
+                tagged = [ self._tag_line(line) for line in chunk ]
+                chunk = [ line for line, tag in tagged ]
+                tags = [ tag for line, tag in tagged ]
+            else:
+                tags = [ _NO_RESPONSE if is_command_line(line) else None for line in chunk ]
+            if self.checkpointer is not None:
+                # A due checkpoint is requested ahead of the whole chunk
+                for tag in tags:
+                    if tag is not _NO_RESPONSE:
+                        self.checkpointer.before_example()
+            self.vw_process.send('\n'.join(chunk) + '\n')
+            if self.sequence_tags:
+                outputs = self._read_tagged_responses(tags)
+            else:
+                outputs = [ self._read_response() if tag is not _NO_RESPONSE else None
+                            for tag in tags ]
+            return outputs
+
+    def _next_tag(self):
+        self._sequence += 1
+        return '{}{}'.format(SEQUENCE_TAG_PREFIX, self._sequence)
+
+    def _tag_line(self, line):
+        """Return a tuple (line, tag) where 'line' has been given a sequence
+        tag unless it already has a tag.  The tag is None for lines whose
+        responses can't be identified (lines that aren't examples, or whose
+        last label token may be an unquoted tag), and _NO_RESPONSE for
+        commands, which are passed through unchanged."""
+        if is_command_line(line):
+            return line, _NO_RESPONSE
+        head, bar, rest = line.partition('|')
+        if not bar:
+            return line, None
+        words = head.split()
+        if words and (words[-1].startswith("'") or not head[-1].isspace()):
+            # VW takes the last word as the tag if it is quoted, or if it
+            # directly precedes the bar
+            return line, (words[-1].lstrip("'") or None)
+        if words and not _is_number(words[-1]) and ':' not in words[-1]:
+            return line, None  # Possibly a tag already; don't add another
+        tag = self._next_tag()
+        head = head.rstrip()
+        if head:
+            head += ' '
+        return head + "'" + tag + '|' + rest, tag
+
+    def _read_tagged_responses(self, tags):
+        """Read the responses to lines with the given 'tags' (in order), using
+        the tag VW echoes in each response to keep requests and responses
+        aligned.  Returns a list of raw outputs, with None for lines whose
+        responses never arrived."""
+        import pexpect
+        outputs = [None] * len(tags)
+        positions = collections.defaultdict(collections.deque)
+        for index, tag in enumerate(tags):
+            if tag is not None and tag is not _NO_RESPONSE:
+                positions[tag].append(index)
+        next_index = 0
+        probe_tag = None
+        while True:
+            while next_index < len(tags) and tags[next_index] is _NO_RESPONSE:
+                next_index += 1  # Commands get no response
+            if next_index >= len(tags):
+                break
+            try:
+                output = self._read_line(timeout=self.resync_timeout if probe_tag is None else -1)
+            except pexpect.TIMEOUT:
+                # Find out which responses are missing by sending a probe
+                # example; its response must follow all the others
+                probe_tag = self._next_tag()
+                self.vw_process.sendline("'" + probe_tag + '|')
+                self.framing_errors['probes'] += 1
+                continue
+            tag = self._response_tag(output, positions, probe_tag)
+            if tag is None:
+                if tags[next_index] is None:  # Untagged line; take any response
+                    index = next_index
+                else:
+                    self.framing_errors['skipped_lines'] += 1
+                    _logging().warning("Skipping unexpected VW output {!r}".format(output))
+                    continue
+            elif tag == probe_tag:
+                index = len(tags)
+                probe_tag = None
+            else:
+                index = positions[tag].popleft()
+            for missing_index in range(next_index, index):
+                missing_tag = tags[missing_index]
+                if missing_tag is _NO_RESPONSE:
+                    continue
+                self.framing_errors['missing_responses'] += 1
+                if missing_tag is not None and missing_index in positions[missing_tag]:
+                    positions[missing_tag].remove(missing_index)
+            if self.checkpointer is not None:
+                for response_index in range(next_index, min(index + 1, len(tags))):
+                    if tags[response_index] is not _NO_RESPONSE:
+                        self.checkpointer.response_received()
+            if index < len(tags):
+                outputs[index] = output
+            next_index = index + 1
+        while probe_tag is not None:
+            # Consume the response to an outstanding probe
+            output = self._read_line(timeout=-1)
+            if self._response_tag(output, {}, probe_tag) == probe_tag:
+                probe_tag = None
+            else:
+                self.framing_errors['skipped_lines'] += 1
+        return outputs
+
+    def _response_tag(self, output, positions, probe_tag=None):
+        """Return the expected tag echoed in the raw 'output', if any."""
+        if isinstance(output, bytes):
+            output = output.decode('UTF-8', 'replace')
+        for token in output.split()[1:]:
+            if token == probe_tag or positions.get(token):
+                return token
+        return None
+
+    def _read_line(self, timeout=-1):
+        """Wait for the next line of output from VW and return it, unparsed.
+        A 'timeout' of -1 means the process object's default.
+        With an audit_index, audit lines are added to the index and skipped."""
         # expect_exact is faster than just exact, and fine for our purpose
         # (http://pexpect.readthedocs.org/en/latest/api/pexpect.html#pexpect.spawn.expect_exact)
         # searchwindowsize and other attributes may also affect efficiency
-        self.vw_process.expect_exact('\r\n', searchwindowsize=-1)  # Wait until process outputs a complete line
-        if parse_result:
-            output = self.vw_process.before
-            result_struct = VWResult(output, active_mode=self.active_mode)
-        else:
-            result_struct = None
-        return result_struct
+        import pexpect
+        while True:
+            try:
+                self.vw_process.expect_exact('\r\n', timeout=timeout, searchwindowsize=-1)  # Wait until process outputs a complete line
+            except pexpect.TIMEOUT:
+                if self.supervisor is not None and timeout == -1:
+                    self.supervisor.handle_timeout(self)  # Restarts VW and raises
+                raise
+            line = self.vw_process.before
+            if self.audit_index is None:
+                return line
+            if not line.strip():
+                continue  # Blank lines around audit output
+            from .audit import parse_audit_line
+            features = parse_audit_line(line)
+            if features is None:
+                return line
+            self.audit_index.update(features)
+
+    def _read_response(self):
+        """Read the response to the next line sent, unparsed."""
+        output = self._read_line()
+        if self.checkpointer is not None:
+            self.checkpointer.response_received()
+        return output
 
     def send_example(self,
                      *args,
@@ -287,9 +605,27 @@ class VW():
         # Pop out the keyword argument 'parse_result' if given
         parse_result = kwargs.pop('parse_result', True)
         line = self.make_line(*args, **kwargs)
-        result = self.send_line(line, parse_result=parse_result)
+        output = self._send_line_raw(line)
+        if parse_result and output is not None:
+            result = VWResult(output, active_mode=self.active_mode)
+        else:
+            result = None
+        if self.metrics is not None:
+            # Same positional order as make_line()
+            response = kwargs['response'] if 'response' in kwargs else (args[0] if args else None)
+            if response is not None:
+                importance = kwargs['importance'] if 'importance' in kwargs else \
+                    (args[1] if len(args) > 1 else None)
+                self._update_metrics(response, importance, output)
         return result
 
+    def _update_metrics(self, response, importance, output):
+        """Record the prediction in raw 'output' from a labeled example."""
+        if output is None:  # Response was lost
+            return
+        prediction = float(output.split(None, 1)[0])
+        self.metrics.update(response, prediction, importance)
+
     def make_line(self,
                   response=None,
                   importance=None,
@@ -377,38 +713,126 @@ class VW():
         result = self.send_example(tag=tag, namespaces=namespaces)
         return result
 
+    def fit_sparse(self,
+                   X,
+                   y,
+                   sample_weight=None,
+                   namespace_map=None,
+                   column_names=None,
+                   chunk_size=None):
+        """Train on every row of 'X' (a scipy.sparse matrix, 2-D array or
+        pandas DataFrame) with labels 'y' and optional importance weights
+        'sample_weight'.  Rows are formatted a chunk at a time straight from
+        the CSR arrays and pipelined to VW.
+
+        'namespace_map' optionally maps namespace names to lists of columns
+        (by index or name); 'column_names' overrides the feature names
+        (by default, DataFrame columns or column indices).
+        See sparse.iter_sparse_lines().  Requires NumPy and SciPy.
+
+        Returns self.
+        """
+        from . import sparse
+        lines = sparse.iter_sparse_lines(X, y,
+                                         sample_weight=sample_weight,
+                                         namespace_map=namespace_map,
+                                         column_names=column_names,
+                                         chunk_size=chunk_size or sparse.DEFAULT_ROWS_PER_CHUNK)
+        if self.metrics is None:
+            self.send_lines(lines, parse_result=False)
+        else:
+            labels = list(y)
+            importances = list(sample_weight) if sample_weight is not None else [None] * len(labels)
+            outputs = self._send_lines_raw(lines)
+            for response, importance, output in zip(labels, importances, outputs):
+                self._update_metrics(response, importance, output)
+        return self
+
+    def predict_sparse(self,
+                       X,
+                       namespace_map=None,
+                       column_names=None,
+                       chunk_size=None):
+        """Get predictions for every row of 'X', as in fit_sparse() but
+        without labels.  Returns a NumPy array of predictions."""
+        from . import sparse
+        lines = sparse.iter_sparse_lines(X,
+                                         namespace_map=namespace_map,
+                                         column_names=column_names,
+                                         chunk_size=chunk_size or sparse.DEFAULT_ROWS_PER_CHUNK)
+        return sparse.predictions_to_array(self._send_lines_raw(lines))
+
+    def predict_multiclass(self, lines, n_classes, k=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Send 'lines' to a VW instance in --oaa or --csoaa mode whose raw
+        predictions go to stdout, e.g.
+            VW(oaa=10, predictions='/dev/null', raw_predictions='/dev/stdout')
+        Returns an (n_lines, n_classes) NumPy array of scores, with column j
+        holding the score of label j + 1; or, if 'k' is given, a tuple
+        (labels, scores) of the top 'k' labels and their scores for each line.
+        See multiclass.top_k().  Requires NumPy.
+        """
+        from . import multiclass
+        scores = multiclass.parse_score_matrix(self._send_lines_raw(lines, chunk_size=chunk_size),
+                                               n_classes)
+        if k is None:
+            return scores
+        return multiclass.top_k(scores, k)
+
     def save_model(self, model_filename):
         """Pass a "command example" to the VW subprocess requesting
         that the current model be serialized to model_filename immediately.
         """
         line = "save_{}|".format(model_filename)
-        self.vw_process.sendline(line)
+        with self.process_lock:
+            self.vw_process.sendline(line)
         # No response is expected in this case
 
+    def sync(self):
+        """Send an empty unlabeled example and wait for its response.
+        Since VW handles lines in order, every earlier command (such as a
+        save_model() request) is complete once this returns."""
+        self.send_line('|', parse_result=False)
+
     def close(self):
-        """Shut down the VW process."""
-        self.vw_process.close()
+        """Shut down the VW process, first completing any pending checkpoint."""
+        if self.checkpointer is not None:
+            self.checkpointer.wait()
+        with self.process_lock:
+            if self.supervisor is not None:
+                self.supervisor.release(self)
+            self.vw_process.close()
         # TODO: Give this a context manager interface
 
-    # TODO: Fancy interface for auditing data?
+
+def spawn_vw_process(command_args, preexec_fn=None):
+    """Start a VW subprocess directly from the argument list 'command_args'
+    (no shell parsing), configured for line-by-line interaction.
+    'preexec_fn', if given, is called in the child just before VW is executed.
+    Returns the pexpect.spawn object."""
+    import pexpect
+    vw_process = pexpect.spawn(command_args[0], list(command_args[1:]), preexec_fn=preexec_fn)
+    # Turn off delaybeforesend; this is necessary only in non-applicable cases
+    vw_process.delaybeforesend = 0
+    vw_process.setecho(False)
+    return vw_process
 
 
-def make_command_line(predictions='/dev/stdout',
+def make_command_args(predictions='/dev/stdout',
                       quiet=True,
                       save_resume=True,
                       q_colon=None,
                       **kwargs
                       ):
-    """Construct a command line for VW, with each named argument corresponding
-    to a VW option.
+    """Construct the argument list for running VW, with each named argument
+    corresponding to a VW option.
     Single character keys are mapped to single-dash options,
-    e.g. 'b=20' yields '-b 20',
+    e.g. 'b=20' yields ['-b', '20'],
     while multiple character keys map to double-dash options:
-        'quiet=True' yields '--quiet'
+        'quiet=True' yields ['--quiet']
     Boolean values are interpreted as flags: present if True, absent if False.
     All other values are treated as option arguments, as in the -b example above.
     If an option argument is a list, that option is repeated multiple times,
-    e.g. 'q=['ab', 'bc']' yields '-q ab -q bc'
+    e.g. 'q=['ab', 'bc']' yields ['-q', 'ab', '-q', 'bc']
 
     q_colon is handled specially, mapping to '--q:'.
 
@@ -420,7 +844,7 @@ def make_command_line(predictions='/dev/stdout',
     NOTE: This function makes no attempt to validate the inputs or
     ensure they are compatible with Wabbit Wappa.
 
-    Outputs a command line string.
+    Outputs a list of strings, starting with 'vw'.
     """
     args = ['vw']
     if q_colon:
@@ -434,18 +858,29 @@ def make_command_line(predictions='/dev/stdout',
         else:
             option = '--{}'.format(key)
         if value is True:
-            arg_list = [option]
+            args.append(option)
+        elif value is False or value is None:
+            continue
         elif isinstance(value, basestring):
-            arg_list = ['{} {}'.format(option, value)]
+            args.extend([option, value])
         elif hasattr(value, '__getitem__'):  # Listlike value
-            arg_list = [ '{} {}'.format(option, subvalue) for subvalue in value ]
+            for subvalue in value:
+                args.extend([option, '{}'.format(subvalue)])
         else:
-            arg_list = ['{} {}'.format(option, value)]
-        args.extend(arg_list)
-    command = ' '.join(args)
-    return command
+            args.extend([option, '{}'.format(value)])
+    return args
 
 
+def join_command_args(command_args):
+    """Join an argument list into a single command line string,
+    quoting any argument that needs it."""
+    return ' '.join(shell_quote(arg) for arg in command_args)
 
 
+def make_command_line(**kwargs):
+    """Construct a command line string for VW.  All arguments are
+    passed to make_command_args(), which documents them.
 
+    Outputs a command line string.
+    """
+    return join_command_args(make_command_args(**kwargs))
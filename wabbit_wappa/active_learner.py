@@ -39,12 +39,17 @@ class ActiveVWProcess():
 
     _buffer = b''
 
-    def __init__(self, command, port=DEFAULT_PORT):
+    def __init__(self, command, port=DEFAULT_PORT, preexec_fn=None):
         """'command' is assumed to have the necessary options for use with this
-        class, which should be guaranteed in the calling context."""
+        class, which should be guaranteed in the calling context.
+        It may be a command line string or an argument list.
+        'preexec_fn' is called in the child just before VW is executed."""
         # Launch the VW process, which we will communicate with only
         # via its socket
-        self.vw_process = pexpect.spawn(command)
+        if isinstance(command, (list, tuple)):
+            self.vw_process = pexpect.spawn(command[0], list(command[1:]), preexec_fn=preexec_fn)
+        else:
+            self.vw_process = pexpect.spawn(command, preexec_fn=preexec_fn)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         connection_tries = 0
         while connection_tries < MAX_CONNECTION_ATTEMPTS:
@@ -58,10 +63,13 @@ class ActiveVWProcess():
 
     def sendline(self, line):
         line = line + '\n'  # This would have been added automatically by pexpect
-        if not isinstance(line, bytes):
-            line = line.encode('UTF-8')
+        self.send(line)
 
-        self.sock.sendall(line)
+    def send(self, data):
+        if not isinstance(data, bytes):
+            data = data.encode('UTF-8')
+
+        self.sock.sendall(data)
 
     def _recvline(self):
         if b'\n' in self._buffer:
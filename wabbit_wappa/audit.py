@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Streaming parser for VW's --audit output, and an index of feature weights
+built from it.
+
+With --audit, VW follows each prediction line with tab-separated tokens
+describing every feature of the example:
+
+    0.214351 example_39
+    	a^height:108232:1.5:0.0823@0.42	a^height*b^red:4711:1.5:-0.01@0.42	Constant:116060:1:0.0154@0.71
+
+Each token is <namespace>^<feature>:<hash>:<value>:<weight>, optionally
+followed by '@' and VW's adaptive/normalization state; quadratic features
+join their parts with '*', and the constant feature has no namespace.
+The AuditIndex keeps the latest weight for every feature it has seen, so
+that model weights can be inspected (and pruning candidates found) as
+training goes on, without dumping an --invert_hash readable model.
+"""
+
+import collections
+import re
+
+
+AuditFeature = collections.namedtuple('AuditFeature',
+                                      ['namespace', 'feature', 'hash', 'value', 'weight'])
+
+AuditRecord = collections.namedtuple('AuditRecord', ['output', 'features'])
+
+audit_token_regex = re.compile(r'^(.+):(\d+):([^:]+):([^:@]+)(?:@.*)?$')
+
+
+def parse_audit_token(token):
+    """Parse one audit token into an AuditFeature, or return None if
+    'token' is not in audit format."""
+    match = audit_token_regex.match(token)
+    if match is None:
+        return None
+    name, feature_hash, value, weight = match.groups()
+    namespaces = []
+    features = []
+    for part in name.split('*'):  # Parts of a quadratic/cubic feature
+        namespace, caret, feature = part.partition('^')
+        if not caret:  # e.g. Constant
+            namespace, feature = '', part
+        namespaces.append(namespace)
+        features.append(feature)
+    try:
+        return AuditFeature('*'.join(namespaces),
+                            '*'.join(features),
+                            int(feature_hash),
+                            float(value),
+                            float(weight))
+    except ValueError:
+        return None
+
+
+def parse_audit_line(line):
+    """Parse a line of audit output into a list of AuditFeatures.
+    Returns None if 'line' is not an audit line (e.g. a prediction)."""
+    if isinstance(line, bytes):
+        line = line.decode('UTF-8')
+    tokens = line.split()
+    if not tokens:
+        return None
+    features = []
+    for token in tokens:
+        feature = parse_audit_token(token)
+        if feature is None:
+            return None
+        features.append(feature)
+    return features
+
+
+def iter_audit_records(lines):
+    """Group a stream of VW --audit output lines into AuditRecords, one per
+    example: the example's (non-audit) output line, and the list of its
+    AuditFeatures.  Audit lines appearing before any output line are
+    reported with output=None."""
+    output = None
+    features = []
+    started = False
+    for line in lines:
+        line_features = parse_audit_line(line)
+        if line_features is None:
+            if started:
+                yield AuditRecord(output, features)
+            if isinstance(line, bytes):
+                line = line.decode('UTF-8')
+            output = line.strip()
+            features = []
+            started = True
+        else:
+            features.extend(line_features)
+            started = True
+    if started:
+        yield AuditRecord(output, features)
+
+
+class AuditIndex():
+    """In-memory index from (namespace, feature) to hash, and from hash to
+    the latest weight seen for it."""
+    def __init__(self):
+        self.hashes = {}  # (namespace, feature) -> hash
+        self.weights = {}  # hash -> latest weight
+        self.names = collections.defaultdict(set)  # hash -> set of (namespace, feature)
+        self.counts = collections.Counter()  # (namespace, feature) -> times seen
+
+    def update(self, features):
+        """Add an iterable of AuditFeatures (or AuditRecords) to the index,
+        replacing any earlier weights.  Returns self."""
+        for feature in features:
+            if isinstance(feature, AuditRecord):
+                self.update(feature.features)
+                continue
+            key = (feature.namespace, feature.feature)
+            self.hashes[key] = feature.hash
+            self.weights[feature.hash] = feature.weight
+            self.names[feature.hash].add(key)
+            self.counts[key] += 1
+        return self
+
+    def update_from_lines(self, lines):
+        """Parse and add a stream of VW --audit output lines.  Returns self."""
+        for record in iter_audit_records(lines):
+            self.update(record.features)
+        return self
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, key):
+        return key in self.hashes
+
+    def hash(self, namespace, feature):
+        return self.hashes[(namespace, feature)]
+
+    def weight(self, namespace, feature):
+        return self.weights[self.hashes[(namespace, feature)]]
+
+    def collisions(self):
+        """Return a dict from each hash shared by more than one feature
+        to the set of those (namespace, feature) pairs."""
+        return dict((feature_hash, names)
+                    for feature_hash, names in self.names.items()
+                    if len(names) > 1)
+
+    def top(self, n=10):
+        """Return the 'n' features with the largest absolute weight, as a
+        list of ((namespace, feature), weight) pairs."""
+        items = [ (key, self.weights[feature_hash]) for key, feature_hash in self.hashes.items() ]
+        items.sort(key=lambda item: abs(item[1]), reverse=True)
+        return items[:n]
+
+    def prune_candidates(self, threshold):
+        """Return the (namespace, feature) pairs whose absolute weight is
+        below 'threshold', sorted by namespace and feature."""
+        return sorted(key for key, feature_hash in self.hashes.items()
+                      if abs(self.weights[feature_hash]) < threshold)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Periodic checkpointing of a running VW model.
+
+VW serializes its model when it reads a "save_<filename>|" command example,
+but prints nothing in reply.  Because VW handles example lines strictly in
+order, the model file is known to be complete as soon as the response to any
+*later* example arrives.  The Checkpointer exploits this: it asks VW to save
+to a temporary file, keeps sending examples, and only when the next response
+comes back does it rename the temporary file into place and rotate away old
+snapshots.  Python never waits explicitly for the save, but VW serializes
+the model inside its main loop, so the response to the example following a
+save request is delayed by however long the save takes.  The time from each
+request to its confirming response is recorded in Checkpointer.save_seconds.
+"""
+
+import logging
+import os
+import re
+import time
+
+
+DEFAULT_KEEP = 3
+TEMP_SUFFIX = '.tmp'
+
+
+class Checkpointer():
+    """Schedules model snapshots for a VW instance every 'every_examples'
+    examples and/or every 'every_seconds' seconds, keeping the last 'keep'
+    snapshots on disk.
+
+    Snapshots are named '<filename>.<sequence number>', e.g. 'model.vw.000012',
+    and each appears on disk only once VW has finished writing it
+    (temporary file plus atomic rename).
+    """
+    def __init__(self,
+                 vw,
+                 filename,
+                 every_examples=None,
+                 every_seconds=None,
+                 keep=DEFAULT_KEEP):
+        """Attach a new Checkpointer to the VW instance 'vw'.
+        At least one of 'every_examples' and 'every_seconds' should be given;
+        otherwise checkpoints are only taken by calling checkpoint().
+        """
+        if keep < 1:
+            raise ValueError("Must keep at least one snapshot (got keep={})".format(keep))
+        self.vw = vw
+        self.filename = filename
+        self.every_examples = every_examples
+        self.every_seconds = every_seconds
+        self.keep = keep
+        self.examples_since_checkpoint = 0
+        self.last_checkpoint_time = time.time()
+        self.sequence = self._find_last_sequence()
+        self.lines_sent = 0
+        self.responses_received = 0
+        self._pending = None  # Temp filename VW is (possibly) still writing
+        self._pending_position = None  # Lines sent before the pending save
+        self._pending_time = None
+        self.save_seconds = []  # Time from each save request to its confirmation
+        vw.checkpointer = self
+
+    def _snapshot_name(self, sequence):
+        return '{}.{:06d}'.format(self.filename, sequence)
+
+    def _find_last_sequence(self):
+        """Continue numbering after any snapshots already on disk."""
+        sequences = [ int(name.rsplit('.', 1)[1]) for name in self.snapshots() ]
+        if sequences:
+            return max(sequences)
+        else:
+            return 0
+
+    def snapshots(self):
+        """Return the filenames of all completed snapshots, oldest first."""
+        directory, basename = os.path.split(self.filename)
+        pattern = re.compile(re.escape(basename) + r'\.\d{6}$')
+        names = [ os.path.join(directory, name)
+                  for name in os.listdir(directory or '.')
+                  if pattern.match(name) ]
+        return sorted(names)
+
+    def latest(self):
+        """Return the filename of the most recent completed snapshot,
+        or None if there is none yet."""
+        snapshots = self.snapshots()
+        if snapshots:
+            return snapshots[-1]
+        else:
+            return None
+
+    def before_example(self):
+        """Called by the VW instance just before it sends each example line.
+        Starts a checkpoint if one is due, so that the save command precedes
+        the example and that example's response confirms the save."""
+        if self.every_examples and self.examples_since_checkpoint >= self.every_examples:
+            self.checkpoint()
+        elif self.every_seconds and time.time() - self.last_checkpoint_time >= self.every_seconds:
+            self.checkpoint()
+        self.examples_since_checkpoint += 1
+        self.lines_sent += 1
+
+    def response_received(self):
+        """Called by the VW instance after each response it reads.  A save
+        requested before the line that produced this response is now
+        complete on disk."""
+        self.responses_received += 1
+        if self._pending is not None and self.responses_received > self._pending_position:
+            self._finalize()
+
+    def checkpoint(self):
+        """Ask VW to write a snapshot now, without waiting for it.
+        If a previous snapshot is still unconfirmed (no later response has
+        been read yet) this does nothing."""
+        if self._pending is not None:
+            return
+        temp_filename = self.filename + TEMP_SUFFIX
+        self.vw.save_model(temp_filename)
+        self._pending = temp_filename
+        self._pending_position = self.lines_sent
+        self._pending_time = time.time()
+        self.examples_since_checkpoint = 0
+        self.last_checkpoint_time = self._pending_time
+
+    def process_restarted(self):
+        """Called when the VW process is replaced: any pending save is
+        abandoned, along with the old process."""
+        self.lines_sent = 0
+        self.responses_received = 0
+        self._pending = None
+        self._pending_position = None
+
+    def wait(self):
+        """Block until any requested snapshot is complete on disk.
+        Returns the filename of the latest snapshot (or None)."""
+        if self._pending is not None:
+            self.vw.sync()  # The sync response triggers response_received()
+        return self.latest()
+
+    def _finalize(self):
+        temp_filename = self._pending
+        self._pending = None
+        self.save_seconds.append(time.time() - self._pending_time)
+        if not os.path.exists(temp_filename):
+            logging.warning("VW did not write checkpoint {}".format(temp_filename))
+            return
+        self.sequence += 1
+        snapshot = self._snapshot_name(self.sequence)
+        os.rename(temp_filename, snapshot)  # Atomic within a POSIX filesystem
+        logging.info("Wrote VW checkpoint {}".format(snapshot))
+        for old_snapshot in self.snapshots()[:-self.keep]:
+            os.remove(old_snapshot)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Previewing VW's feature hashes and sizing -b from a sample of examples.
+
+A CollisionAnalyzer streams examples (Namespace lists, or make_line()
+output), hashes every feature the way VW would (including -q
+interactions), and keeps:
+-a HyperLogLog sketch of the distinct features seen, from which the
+    expected number of hash collisions is reported for every -b
+-an exact occupancy bitmap of the weight table for each -b being
+    tracked, giving the collisions actually observed at that size
+
+Memory use is fixed by the sketch precision and the tracked -b values,
+however many features are seen.
+
+    analyzer = CollisionAnalyzer(q='ab', tracked_bits=[18, 22])
+    for line in sample_lines:
+        analyzer.add_line(line)
+    for row in analyzer.report():
+        print(row['bits'], row['collision_rate'])
+"""
+
+import math
+
+from . import Namespace, hashing
+
+
+DEFAULT_PRECISION = 14  # 2**14 HyperLogLog registers; about 0.8% error
+DEFAULT_REPORT_BITS = range(10, 33)
+DEFAULT_TRACKED_BITS = (18,)  # VW's default -b
+IDENTITY_SEED = 0x5bd1e995  # Seeds the second hash that tells features apart
+MASK64 = 0xffffffffffffffff
+
+# Number of set bits in each byte value
+POPCOUNT_TABLE = bytes(bytearray(bin(i).count('1') for i in range(256)))
+
+
+def _mix64(key):
+    """MurmurHash3's 64-bit finalizer, spreading 'key' over all 64 bits."""
+    key ^= key >> 33
+    key = (key * 0xff51afd7ed558ccd) & MASK64
+    key ^= key >> 33
+    key = (key * 0xc4ceb9fe1a85ec53) & MASK64
+    key ^= key >> 33
+    return key
+
+
+def parse_example_line(line):
+    """Return a list of Namespace objects for the features of the VW example
+    'line' (as produced by VW.make_line()), ignoring its label and tag."""
+    namespaces = []
+    for part in line.split('|')[1:]:
+        tokens = part.split()
+        name = None
+        scale = None
+        if part and not part[0].isspace() and tokens:
+            name, _, scale = tokens.pop(0).partition(':')
+            scale = float(scale) if scale else None
+        features = []
+        for token in tokens:
+            label, _, value = token.partition(':')
+            features.append((label, float(value) if value else None))
+        namespaces.append(Namespace(name, scale, features, escape=False, validate=False))
+    return namespaces
+
+
+def preview_hashes(namespaces, bits=18, quadratic=(), hash_seed=0):
+    """Return a list of (feature name, weight index) pairs for every feature
+    VW would derive from the Namespace objects 'namespaces' with -b 'bits'
+    and the -q specifications 'quadratic'.  Names follow VW's audit format:
+    'namespace^feature', with '*' joining quadratic features."""
+    mask = (1 << bits) - 1
+    return [ (name, feature_hash & mask)
+             for name, feature_hash, value in hashing.iter_example_hashes(
+                 namespaces, quadratic, hash_seed, names=True) ]
+
+
+def expected_collisions(n, bits):
+    """Expected number of the 'n' distinct features that share a weight
+    with another feature in a table of 2**bits weights (those beyond the
+    first in each occupied slot): n - m * (1 - exp(-n / m))."""
+    m = 1 << bits
+    occupied = -m * math.expm1(-n / m)
+    return max(n - occupied, 0.)
+
+
+class HyperLogLog():
+    """Estimates the number of distinct 64-bit keys added, in 2**precision
+    bytes."""
+    def __init__(self, precision=DEFAULT_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._shift = 64 - precision
+        self._low_mask = (1 << self._shift) - 1
+
+    def add(self, key):
+        """Add a (well mixed) 64-bit key."""
+        register = key >> self._shift
+        rank = self._shift - (key & self._low_mask).bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def merge(self, other):
+        """Add all the keys counted by HyperLogLog 'other' (of the same
+        precision) to this one."""
+        if other.precision != self.precision:
+            raise ValueError("Can't merge HyperLogLogs of different precisions")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self):
+        """Return the estimated number of distinct keys."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2. ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:  # Small range: use linear counting
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+
+class CollisionAnalyzer():
+    """Counts the distinct features in a stream of examples and reports the
+    hash collisions to expect at each -b."""
+    def __init__(self,
+                 q=None,
+                 q_colon=None,
+                 tracked_bits=DEFAULT_TRACKED_BITS,
+                 constant=True,
+                 hash_seed=0,
+                 precision=DEFAULT_PRECISION):
+        """'q' and 'q_colon' are -q interaction specifications, as given to
+        make_command_args().
+        'tracked_bits' lists the -b values whose weight table occupancy is
+            tracked exactly, in a bitmap of 2**b bits each.
+        If 'constant', VW's constant feature is counted too.
+        'hash_seed' is VW's --hash_seed.
+        'precision' sets the HyperLogLog size (see HyperLogLog).
+        """
+        self.quadratic = hashing.quadratic_specs(q=q, q_colon=q_colon)
+        self.constant = constant
+        self.hash_seed = hash_seed
+        self.sketch = HyperLogLog(precision)
+        self.bitmaps = dict((bits, bytearray(max((1 << bits) >> 3, 1)))
+                            for bits in tracked_bits)
+        self.examples = 0
+        self.features = 0  # Feature occurrences, counting repeats
+
+    def _add_hash(self, feature_hash, identity):
+        """Record a feature with VW hash 'feature_hash'; 'identity' is a
+        second, independent 32-bit hash distinguishing features whose VW
+        hashes coincide."""
+        self.sketch.add(_mix64((feature_hash << 32) | identity))
+        for bits, bitmap in self.bitmaps.items():
+            index = feature_hash & ((1 << bits) - 1)
+            bitmap[index >> 3] |= 1 << (index & 7)
+        self.features += 1
+
+    def add_namespaces(self, namespaces):
+        """Add one example, given as a list of Namespace objects."""
+        for name, feature_hash, value in hashing.iter_example_hashes(
+                namespaces, self.quadratic, self.hash_seed, names=True):
+            self._add_hash(feature_hash, hashing.murmurhash3_32(name, IDENTITY_SEED))
+        if self.constant:
+            self._add_hash(hashing.CONSTANT_HASH, 0)
+        self.examples += 1
+
+    def add_line(self, line):
+        """Add one example given as a VW example line."""
+        self.add_namespaces(parse_example_line(line))
+
+    def add_lines(self, lines):
+        """Add an iterable of VW example lines."""
+        for line in lines:
+            self.add_line(line)
+
+    def distinct_features(self):
+        """Return the estimated number of distinct features seen."""
+        return self.sketch.count()
+
+    def occupied(self, bits):
+        """Return the exact number of weights used at a tracked -b 'bits'."""
+        return sum(bytearray(bytes(self.bitmaps[bits]).translate(POPCOUNT_TABLE)))
+
+    def report(self, bits=DEFAULT_REPORT_BITS):
+        """Return a list of dicts, one for each -b in 'bits', giving the
+        expected number of colliding features ('expected_collisions') and
+        their fraction of all distinct features ('collision_rate').  For
+        tracked -b values, 'occupied' weights and 'observed_collisions'
+        (distinct features minus occupied weights, so subject to the
+        sketch's error) are included too."""
+        n = self.distinct_features()
+        rows = []
+        for b in sorted(set(bits) | set(self.bitmaps)):
+            collisions = expected_collisions(n, b)
+            row = dict(bits=b,
+                       weights=1 << b,
+                       distinct_features=n,
+                       expected_collisions=collisions,
+                       collision_rate=collisions / n if n else 0.,
+                       )
+            if b in self.bitmaps:
+                occupied = self.occupied(b)
+                row['occupied'] = occupied
+                row['observed_collisions'] = max(n - occupied, 0.)
+            rows.append(row)
+        return rows
+
+    def recommend_bits(self, max_collision_rate=0.01):
+        """Return the smallest -b at which the expected fraction of
+        colliding features is at most 'max_collision_rate'."""
+        n = self.distinct_features()
+        for b in range(1, 33):
+            if not n or expected_collisions(n, b) / n <= max_collision_rate:
+                return b
+        return 32
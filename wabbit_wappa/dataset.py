@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Writing VW example lines to (compressed, sharded) dataset files for offline
+training with 'vw -d'.
+
+Lines are collected into blocks, and each block is compressed on a pool of
+worker threads (zlib and zstandard release the GIL while compressing), then
+written in order.  Each gzip block is a complete gzip member; concatenated
+members form a valid gzip file, which VW reads with --compressed.
+
+zstd output requires the 'zstandard' package.  VW itself cannot read zstd,
+so those files must be decompressed (e.g. 'zstd -dc data.zst | vw ...')
+before training.
+"""
+
+import threading
+import time
+import zlib
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from . import VW
+
+
+DEFAULT_BLOCK_SIZE = 1 << 20  # Uncompressed bytes per compressed block
+DEFAULT_THREADS = 4
+GZIP_WBITS = 31  # zlib window bits for gzip format
+EXTENSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _gzip_compressor(level):
+    def compress(data):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    return compress
+
+
+def _zstd_compressor(level):
+    import zstandard
+    local = threading.local()  # ZstdCompressor objects aren't thread-safe
+
+    def compress(data):
+        if not hasattr(local, 'compressor'):
+            local.compressor = zstandard.ZstdCompressor(level=level)
+        return local.compressor.compress(data)
+    return compress
+
+
+class _ShardWriter():
+    """Writes compressed blocks for one output file, in order, using a
+    shared pool of compression threads."""
+    def __init__(self, filename, compress, work_queue):
+        self.file = open(filename, 'wb')
+        self.compress = compress
+        self.work_queue = work_queue
+        self.pending = []  # List of (done event, result holder), in order
+        self.buffer = []
+        self.buffer_size = 0
+        self.bytes_out = 0
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffer_size += len(data)
+
+    def submit(self):
+        if not self.buffer:
+            return
+        block = b''.join(self.buffer)
+        self.buffer = []
+        self.buffer_size = 0
+        if self.compress is None:
+            self._write_block(block)
+            return
+        done = threading.Event()
+        holder = {}
+        self.work_queue.put((self.compress, block, done, holder))
+        self.pending.append((done, holder))
+
+    def drain(self, wait=False):
+        """Write out compressed blocks that are ready (all of them if 'wait')."""
+        while self.pending and (wait or self.pending[0][0].is_set()):
+            done, holder = self.pending.pop(0)
+            done.wait()
+            if 'error' in holder:
+                raise holder['error']
+            self._write_block(holder['result'])
+
+    def _write_block(self, block):
+        self.file.write(block)
+        self.bytes_out += len(block)
+
+    def close(self):
+        self.submit()
+        self.drain(wait=True)
+        self.file.close()
+
+
+def _compression_worker(work_queue):
+    while True:
+        item = work_queue.get()
+        if item is None:
+            break
+        compress, block, done, holder = item
+        try:
+            holder['result'] = compress(block)
+        except Exception as error:
+            holder['error'] = error
+        done.set()
+
+
+class DatasetWriter():
+    """Streams VW example lines to one or more (compressed) files.
+
+    Usage:
+        with DatasetWriter('train.vw', compression='gzip', shards=4) as writer:
+            for label, features in examples:
+                writer.write_example(label, features=features)
+        print(writer.stats())
+
+    produces train.vw.00000.gz ... train.vw.00003.gz, each readable with
+    'vw --compressed -d'.
+    """
+    def __init__(self,
+                 filename,
+                 compression='gzip',
+                 level=6,
+                 shards=1,
+                 threads=DEFAULT_THREADS,
+                 block_size=DEFAULT_BLOCK_SIZE):
+        """'compression' is 'gzip', 'zstd' or None.
+        'level' is the compression level.
+        With 'shards' > 1, lines are split between that many files
+            by a hash of each line (or of the shard key given when writing);
+            otherwise a single file 'filename' is written (with a
+            compression extension added).
+        'threads' is the number of compression threads.
+        'block_size' is the amount of uncompressed data compressed at once.
+        """
+        if compression not in EXTENSIONS:
+            raise ValueError("Unknown compression {}".format(compression))
+        if compression == 'gzip':
+            compress = _gzip_compressor(level)
+        elif compression == 'zstd':
+            compress = _zstd_compressor(level)
+        else:
+            compress = None
+        self.compression = compression
+        self.shards = shards
+        self.block_size = block_size
+        extension = EXTENSIONS[compression]
+        if shards > 1:
+            self.filenames = [ '{}.{:05d}{}'.format(filename, shard, extension)
+                               for shard in range(shards) ]
+        else:
+            self.filenames = [ filename + extension ]
+        self.work_queue = queue.Queue(maxsize=2 * max(threads, 1))
+        self.threads = []
+        if compress is not None:
+            for i in range(threads):
+                thread = threading.Thread(target=_compression_worker, args=(self.work_queue,))
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+        self.writers = [ _ShardWriter(name, compress, self.work_queue) for name in self.filenames ]
+        self._line_maker = VW(dummy_mode=True)
+        self.examples = 0
+        self.bytes_in = 0
+        self.start_time = time.time()
+        self.end_time = None
+
+    def write_line(self, line, shard_key=None):
+        """Write one VW example line.  'shard_key' (by default the line
+        itself) determines the shard the line goes to."""
+        data = (line + '\n').encode('UTF-8')
+        if self.shards > 1:
+            if shard_key is None:
+                key = data
+            elif isinstance(shard_key, bytes):
+                key = shard_key
+            else:
+                key = ('{}'.format(shard_key)).encode('UTF-8')
+            writer = self.writers[(zlib.crc32(key) & 0xffffffff) % self.shards]
+        else:
+            writer = self.writers[0]
+        writer.write(data)
+        self.examples += 1
+        self.bytes_in += len(data)
+        if writer.buffer_size >= self.block_size:
+            writer.submit()
+            writer.drain()
+
+    def write_lines(self, lines):
+        """Write an iterable of VW example lines."""
+        for line in lines:
+            self.write_line(line)
+
+    def write_example(self, *args, **kwargs):
+        """Write an example built by VW.make_line() from the given arguments.
+        An optional 'shard_key' keyword argument is passed to write_line()."""
+        shard_key = kwargs.pop('shard_key', None)
+        line = self._line_maker.make_line(*args, **kwargs)
+        self.write_line(line, shard_key=shard_key)
+
+    def close(self):
+        """Flush all data and close the output files."""
+        if self.end_time is not None:
+            return
+        for writer in self.writers:
+            writer.close()
+        for thread in self.threads:
+            self.work_queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.end_time = time.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def stats(self):
+        """Return a dict of throughput statistics: examples and bytes written,
+        and MB/s (of uncompressed data) and examples/s."""
+        elapsed = (self.end_time or time.time()) - self.start_time
+        bytes_out = sum(writer.bytes_out for writer in self.writers)
+        result = dict(examples=self.examples,
+                      bytes_in=self.bytes_in,
+                      bytes_out=bytes_out,
+                      seconds=elapsed,
+                      )
+        if elapsed > 0:
+            result['mb_per_second'] = self.bytes_in / elapsed / 1e6
+            result['examples_per_second'] = self.examples / elapsed
+        if bytes_out:
+            result['compression_ratio'] = self.bytes_in / bytes_out
+        return result
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+scikit-learn compatible estimators backed by a VW subprocess.
+
+Each input matrix is serialized a chunk at a time (see sparse.py) and
+pipelined through VW, so fit() and predict() cost one round trip per chunk
+rather than per row.  Estimators pickle by saving the VW model, so they can
+be used with joblib and parallel cross-validation.
+
+Requires NumPy and SciPy; scikit-learn itself is optional, but provides
+get_params()/set_params(), clone() and score() when installed.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from . import VW
+
+try:
+    from sklearn.base import BaseEstimator, ClassifierMixin, RegressorMixin
+except ImportError:
+    class BaseEstimator(object):
+        pass
+
+    class ClassifierMixin(object):
+        pass
+
+    class RegressorMixin(object):
+        pass
+
+
+class VWEstimator(BaseEstimator):
+    """Base class for VWClassifier and VWRegressor"""
+
+    _default_loss_function = None
+
+    def __init__(self,
+                 loss_function=None,
+                 passes=1,
+                 namespace_map=None,
+                 vw_options=None,
+                 chunk_size=None):
+        """'loss_function' is VW's --loss_function (a default suited to the
+        estimator type is used if None).
+        'passes' is the number of online passes fit() makes over the data.
+        'namespace_map' maps namespace names to lists of columns, as in
+            VW.fit_sparse().
+        'vw_options' is a dict of any further keyword arguments for VW(),
+            e.g. {'b': 24, 'l': 0.5, 'q': ['ab']}.
+        'chunk_size' is the number of rows serialized at once.
+        """
+        self.loss_function = loss_function
+        self.passes = passes
+        self.namespace_map = namespace_map
+        self.vw_options = vw_options
+        self.chunk_size = chunk_size
+
+    def _start_vw(self, model_filename=None):
+        options = dict(self.vw_options or {})
+        options['loss_function'] = self.loss_function or self._default_loss_function
+        if model_filename is not None:
+            options['i'] = model_filename
+        self.vw_ = VW(**options)
+
+    def close(self):
+        """Shut down the underlying VW process, if any."""
+        vw = self.__dict__.pop('vw_', None)
+        if vw is not None:
+            vw.close()
+
+    def _train(self, X, labels, sample_weight=None):
+        if not hasattr(self, 'vw_'):
+            self._start_vw()
+        self.vw_.fit_sparse(X, labels,
+                            sample_weight=sample_weight,
+                            namespace_map=self.namespace_map,
+                            chunk_size=self.chunk_size)
+
+    def decision_function(self, X):
+        """Return VW's raw prediction for each row of X, as a NumPy array."""
+        return self.vw_.predict_sparse(X,
+                                       namespace_map=self.namespace_map,
+                                       chunk_size=self.chunk_size)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        vw = state.pop('vw_', None)
+        if vw is not None:
+            handle, model_filename = tempfile.mkstemp(suffix='.vw')
+            os.close(handle)
+            try:
+                vw.save_model(model_filename)
+                vw.sync()
+                with open(model_filename, 'rb') as model_file:
+                    state['model_bytes_'] = model_file.read()
+            finally:
+                os.remove(model_filename)
+        return state
+
+    def __setstate__(self, state):
+        model_bytes = state.pop('model_bytes_', None)
+        self.__dict__.update(state)
+        if model_bytes is not None:
+            handle, model_filename = tempfile.mkstemp(suffix='.vw')
+            try:
+                with os.fdopen(handle, 'wb') as model_file:
+                    model_file.write(model_bytes)
+                self._start_vw(model_filename)
+                self.vw_.sync()  # VW has finished loading the model after this
+            finally:
+                os.remove(model_filename)
+
+
+class VWClassifier(ClassifierMixin, VWEstimator):
+    """Binary classifier; by default, VW logistic regression."""
+
+    _default_loss_function = 'logistic'
+
+    def _labels(self, y):
+        y = np.asarray(y)
+        if not np.isin(y, self.classes_).all():
+            raise ValueError("y contains classes not in {}".format(self.classes_))
+        return np.where(y == self.classes_[1], 1, -1)
+
+    def fit(self, X, y, sample_weight=None):
+        """Train a fresh model on X and y.  Returns self."""
+        self.close()
+        self.classes_ = np.unique(y)
+        if len(self.classes_) != 2:
+            raise ValueError("VWClassifier supports exactly two classes; got {}".format(self.classes_))
+        labels = self._labels(y)
+        for i in range(self.passes):
+            self._train(X, labels, sample_weight)
+        return self
+
+    def partial_fit(self, X, y, classes=None, sample_weight=None):
+        """Continue training online on X and y.  'classes' must be given
+        on the first call.  Returns self."""
+        if not hasattr(self, 'classes_'):
+            if classes is None:
+                raise ValueError("classes must be given on the first call to partial_fit()")
+            self.classes_ = np.unique(classes)
+            if len(self.classes_) != 2:
+                raise ValueError("VWClassifier supports exactly two classes; got {}".format(self.classes_))
+        self._train(X, self._labels(y), sample_weight)
+        return self
+
+    def predict(self, X):
+        """Return the predicted class for each row of X."""
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+    def predict_proba(self, X):
+        """Return an array of shape (n_rows, 2) with the probability of each
+        class, taking VW's prediction as a logistic margin."""
+        probability = 1. / (1. + np.exp(-self.decision_function(X)))
+        return np.column_stack([1. - probability, probability])
+
+
+class VWRegressor(RegressorMixin, VWEstimator):
+    """Regressor; by default, VW least squares."""
+
+    _default_loss_function = 'squared'
+
+    def fit(self, X, y, sample_weight=None):
+        """Train a fresh model on X and y.  Returns self."""
+        self.close()
+        for i in range(self.passes):
+            self._train(X, np.asarray(y), sample_weight)
+        return self
+
+    def partial_fit(self, X, y, sample_weight=None):
+        """Continue training online on X and y.  Returns self."""
+        self._train(X, np.asarray(y), sample_weight)
+        return self
+
+    def predict(self, X):
+        """Return the predicted value for each row of X."""
+        return self.decision_function(X)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Pure-Python reproduction of VW's feature hashing.
+
+VW hashes each namespace name with MurmurHash3 (x86, 32 bit) to get a seed,
+then hashes each feature name in that namespace with that seed.  Purely
+numeric feature names are not hashed but added to the seed.  The weight
+index of a feature is its hash masked to the -b bits; a quadratic feature
+combines the hashes of its two parts.
+"""
+
+import re
+import struct
+
+from . import basestring
+
+
+HASH_MASK = 0xffffffff
+CONSTANT_HASH = 11650396  # VW's hash for the constant (bias) feature
+QUADRATIC_CONSTANT = 27942141  # Multiplier used to combine quadratic features
+
+digits_regex = re.compile(r'^[0-9]+$')
+
+
+def murmurhash3_32(data, seed=0):
+    """MurmurHash3 x86 32-bit hash of 'data' (bytes, or text which is
+    encoded as UTF-8), as an unsigned int."""
+    if not isinstance(data, bytes):
+        data = data.encode('UTF-8')
+    c1 = 0xcc9e2d51
+    c2 = 0x1b873593
+    length = len(data)
+    h1 = seed & HASH_MASK
+    rounded_end = length & ~0x3
+    for i in range(0, rounded_end, 4):
+        k1, = struct.unpack_from('<I', data, i)
+        k1 = (k1 * c1) & HASH_MASK
+        k1 = ((k1 << 15) | (k1 >> 17)) & HASH_MASK
+        k1 = (k1 * c2) & HASH_MASK
+        h1 ^= k1
+        h1 = ((h1 << 13) | (h1 >> 19)) & HASH_MASK
+        h1 = (h1 * 5 + 0xe6546b64) & HASH_MASK
+    tail = bytearray(data[rounded_end:])
+    k1 = 0
+    tail_length = len(tail)
+    if tail_length == 3:
+        k1 ^= tail[2] << 16
+    if tail_length >= 2:
+        k1 ^= tail[1] << 8
+    if tail_length >= 1:
+        k1 ^= tail[0]
+        k1 = (k1 * c1) & HASH_MASK
+        k1 = ((k1 << 15) | (k1 >> 17)) & HASH_MASK
+        k1 = (k1 * c2) & HASH_MASK
+        h1 ^= k1
+    h1 ^= length
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85ebca6b) & HASH_MASK
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xc2b2ae35) & HASH_MASK
+    h1 ^= h1 >> 16
+    return h1
+
+
+def hash_string(s, seed=0):
+    """Hash a namespace or feature name the way VW does: strings of digits
+    are added to 'seed', and anything else is MurmurHash3'ed with it."""
+    s = s.strip(' ')
+    if digits_regex.match(s):
+        return (int(s) + seed) & HASH_MASK
+    return murmurhash3_32(s, seed)
+
+
+def hash_namespace(name, hash_seed=0):
+    """Return the seed used for features in the namespace 'name'
+    (None or '' for the default namespace)."""
+    if not name:
+        return hash_seed
+    return hash_string(name, hash_seed)
+
+
+def hash_feature(feature, namespace_hash):
+    """Return the (unmasked) hash of 'feature' in a namespace
+    with hash 'namespace_hash'."""
+    return hash_string(feature, namespace_hash)
+
+
+def hash_quadratic(hash1, hash2):
+    """Return the (unmasked) hash of the quadratic feature combining
+    features with hashes 'hash1' and 'hash2'."""
+    return (QUADRATIC_CONSTANT * hash1 + hash2) & HASH_MASK
+
+
+def namespace_name(namespace):
+    """Return the name VW hashes for a Namespace (without its scale),
+    or '' for the default namespace."""
+    return namespace.name or ''
+
+
+def namespace_index(namespace):
+    """Return the single character VW uses to identify 'namespace'
+    in -q options (' ' for the default namespace)."""
+    name = namespace_name(namespace)
+    return name[0] if name else ' '
+
+
+def iter_interactions(quadratic, indices):
+    """Given 'quadratic', a list of two-character -q specifications
+    (where ':' matches any namespace), and 'indices', the namespace
+    index characters present in an example, yield each pair of index
+    characters to be crossed."""
+    present = sorted(set(indices))
+    for pair in quadratic:
+        first, second = pair[0], pair[1]
+        firsts = present if first == ':' else [first]
+        seconds = present if second == ':' else [second]
+        for index1 in firsts:
+            for index2 in seconds:
+                if index1 in present and index2 in present:
+                    yield index1, index2
+
+
+def quadratic_specs(q=None, q_colon=None):
+    """Convert make_command_args() style 'q' and 'q_colon' arguments into
+    a list of two-character interaction specifications."""
+    specs = []
+    for value, template in [(q, '{}'), (q_colon, '{}:')]:
+        if value is None:
+            continue
+        if isinstance(value, basestring):
+            value = [value]
+        specs.extend(template.format(spec) for spec in value)
+    return specs
+
+
+def iter_example_hashes(namespaces, quadratic=(), hash_seed=0, names=False):
+    """Yield a (hash, value) pair for every feature VW would derive from
+    the Namespace objects 'namespaces', including quadratic features for the
+    -q specifications in 'quadratic'.  The constant feature is not included.
+    Hashes are unmasked; mask them with (1 << bits) - 1 for weight indices.
+    If 'names', yield (name, hash, value) triples instead, with names in
+    VW's audit format: 'namespace^feature', with '*' joining the two parts
+    of a quadratic feature.
+    """
+    by_index = {}
+    for namespace in namespaces:
+        name = namespace_name(namespace)
+        namespace_hash = hash_namespace(name, hash_seed)
+        scale = float(namespace.scale) if namespace.scale else 1.
+        hashed = by_index.setdefault(namespace_index(namespace), [])
+        for label, value in namespace.features:
+            value = scale * (1. if value is None else float(value))
+            feature_hash = hash_feature(label, namespace_hash)
+            feature_name = name + '^' + label if names else None
+            if quadratic:
+                hashed.append((feature_name, feature_hash, value))
+            if names:
+                yield feature_name, feature_hash, value
+            else:
+                yield feature_hash, value
+    for index1, index2 in iter_interactions(quadratic, by_index):
+        for name1, hash1, value1 in by_index[index1]:
+            for name2, hash2, value2 in by_index[index2]:
+                feature_hash = hash_quadratic(hash1, hash2)
+                if names:
+                    yield name1 + '*' + name2, feature_hash, value1 * value2
+                else:
+                    yield feature_hash, value1 * value2
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+In-process scoring of plain linear VW models.
+
+A model saved with --readable_model (or --invert_hash) is loaded into a NumPy
+weight array, and Namespace objects are scored by reproducing VW's feature
+hashing (see hashing.py), including -q quadratic features.  This avoids a
+round trip to a VW subprocess when all that's needed is a dot product.
+
+Only plain linear models are supported: no --oaa, --lda, --rank, ngrams,
+skips, cubic features or link functions.
+
+Requires NumPy.
+"""
+
+import re
+
+import numpy as np
+
+from . import hashing
+
+
+header_regex = re.compile(r'^(Version|Min label|Max label|bits|lda|rank|options):\s*(.*)$')
+pairs_regex = re.compile(r'^(\d+) pairs:\s*(.*)$')
+
+
+class LinearModel():
+    """A VW linear model held as a NumPy weight array."""
+    def __init__(self,
+                 weights,
+                 min_label=-50.,
+                 max_label=50.,
+                 quadratic=(),
+                 constant=True,
+                 hash_seed=0):
+        """'weights' is an array of 2**bits weights, indexed by masked hash.
+        Predictions are clipped to ['min_label', 'max_label'], as VW does.
+        'quadratic' is a list of -q specifications, e.g. ['ab', 'a:'].
+        If 'constant' is False, no constant (bias) feature is added,
+        as with --noconstant.
+        """
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bits = int(np.log2(len(self.weights)))
+        if 1 << self.bits != len(self.weights):
+            raise ValueError("Number of weights must be a power of 2; got {}".format(len(self.weights)))
+        self.mask = (1 << self.bits) - 1
+        self.min_label = min_label
+        self.max_label = max_label
+        self.quadratic = list(quadratic)
+        self.constant = constant
+        self.hash_seed = hash_seed
+
+    @classmethod
+    def from_readable_model(cls, filename, quadratic=None, constant=True):
+        """Load a model written by VW with --readable_model or --invert_hash.
+        Interactions are read from the model's "pairs" header unless
+        'quadratic' is given."""
+        header = {}
+        pairs = []
+        weights = None
+        with open(filename) as model_file:
+            for line in model_file:
+                line = line.rstrip('\n')
+                match = header_regex.match(line)
+                if match is not None:
+                    header[match.group(1)] = match.group(2).strip()
+                    if match.group(1) == 'bits':
+                        weights = np.zeros(1 << int(match.group(2)), dtype=np.float32)
+                    continue
+                match = pairs_regex.match(line)
+                if match is not None:
+                    pairs.extend(match.group(2).split())
+                    continue
+                if weights is None or not line.strip():
+                    continue
+                # "index:weight" or "name:index:weight", maybe followed
+                # by adaptive/normalization state after whitespace
+                name_index, _, weight = line.split()[0].rpartition(':')
+                index = name_index.rpartition(':')[2]
+                if not index.isdigit():
+                    continue
+                weights[int(index) & (len(weights) - 1)] = float(weight)
+        if weights is None:
+            raise ValueError("{} is not a readable VW model (no 'bits:' line)".format(filename))
+        options = header.get('options', '').split()
+        if quadratic is None:
+            quadratic = pairs
+            for i, option in enumerate(options[:-1]):
+                if option in ('-q', '--quadratic') and options[i + 1] not in quadratic:
+                    quadratic.append(options[i + 1])
+        if '--noconstant' in options:
+            constant = False
+        return cls(weights,
+                   min_label=float(header.get('Min label', -50.)),
+                   max_label=float(header.get('Max label', 50.)),
+                   quadratic=quadratic,
+                   constant=constant)
+
+    def example_features(self, namespaces):
+        """Return a pair of arrays (weight indices, values) for the features
+        VW would derive from the Namespace objects 'namespaces'."""
+        indices = []
+        values = []
+        for feature_hash, value in hashing.iter_example_hashes(namespaces, self.quadratic,
+                                                               self.hash_seed):
+            indices.append(feature_hash & self.mask)
+            values.append(value)
+        if self.constant:
+            indices.append(hashing.CONSTANT_HASH & self.mask)
+            values.append(1.)
+        return np.array(indices, dtype=np.intp), np.array(values, dtype=np.float64)
+
+    def score_batch(self, examples):
+        """Score a list of examples, each a list of Namespace objects.
+        Returns a NumPy array of predictions, as VW would output them."""
+        rows = []
+        all_indices = []
+        all_values = []
+        for row, namespaces in enumerate(examples):
+            indices, values = self.example_features(namespaces)
+            rows.append(np.full(len(indices), row, dtype=np.intp))
+            all_indices.append(indices)
+            all_values.append(values)
+        if not rows:
+            return np.zeros(0)
+        rows = np.concatenate(rows)
+        products = self.weights[np.concatenate(all_indices)] * np.concatenate(all_values)
+        scores = np.bincount(rows, weights=products, minlength=len(examples))
+        return np.clip(scores, self.min_label, self.max_label)
+
+    def score(self, namespaces):
+        """Score a single example given as a list of Namespace objects."""
+        return float(self.score_batch([namespaces])[0])
+
+
+def load_readable_model(filename, quadratic=None):
+    """Load a VW readable model file into a LinearModel."""
+    return LinearModel.from_readable_model(filename, quadratic=quadratic)
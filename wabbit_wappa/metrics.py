@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Progressive validation metrics, computed as VW trains.
+
+The prediction VW returns for a labeled example is made *before* VW learns
+from it, so comparing it with the label gives an honest, free estimate of
+generalization error ("progressive validation").  OnlineMetrics accumulates
+log loss, squared loss (Brier score), AUC and calibration from these pairs with a constant
+amount of work per example.  AUC and calibration use a fixed-size histogram
+of predicted probabilities, so memory does not grow with the number of
+examples; with a sliding 'window', the last 'window' examples are kept so
+they can be subtracted back out.
+"""
+
+import collections
+import math
+
+
+DEFAULT_BINS = 100
+EPSILON = 1e-15  # Probabilities are clipped to [EPSILON, 1 - EPSILON] for log loss
+
+
+class OnlineMetrics():
+    """Streaming log loss, squared loss, AUC and calibration."""
+    def __init__(self, link='logistic', threshold=0., bins=DEFAULT_BINS, window=None):
+        """'link' maps VW's raw prediction to a probability: 'logistic' (for
+        --loss_function logistic) or 'identity' (predictions are already
+        probabilities, e.g. with --link logistic).
+        A label is positive if it is greater than 'threshold' (0 suits
+        VW's -1/1 labels; use 0.5 for 0/1 labels).
+        'bins' is the resolution of the probability histogram used for
+        AUC and calibration.
+        If 'window' is given, metrics cover only the last 'window' examples.
+        """
+        if link not in ('logistic', 'identity'):
+            raise ValueError("Unknown link {}".format(link))
+        self.link = link
+        self.threshold = threshold
+        self.bins = bins
+        self.window = window
+        self._history = collections.deque() if window else None
+        self.reset()
+
+    def reset(self):
+        """Forget all examples seen so far."""
+        self.count = 0
+        self.weight = 0.
+        self.log_loss_sum = 0.
+        self.squared_loss_sum = 0.
+        self.positive_weight = 0.
+        self.positive_counts = [0.] * self.bins
+        self.negative_counts = [0.] * self.bins
+        self.probability_sums = [0.] * self.bins
+        if self._history is not None:
+            self._history.clear()
+
+    def probability(self, prediction):
+        if self.link == 'logistic':
+            if prediction >= 0:
+                return 1. / (1. + math.exp(-prediction))
+            else:
+                exp_prediction = math.exp(prediction)
+                return exp_prediction / (1. + exp_prediction)
+        else:
+            return min(max(prediction, 0.), 1.)
+
+    def update(self, label, prediction, importance=None):
+        """Record one (label, prediction) pair, with optional
+        importance weight."""
+        weight = 1. if importance is None else float(importance)
+        label = float(label)
+        prediction = float(prediction)
+        positive = label > self.threshold
+        probability = self.probability(prediction)
+        clipped = min(max(probability, EPSILON), 1. - EPSILON)
+        if positive:
+            log_loss = -math.log(clipped)
+        else:
+            log_loss = -math.log(1. - clipped)
+        squared_loss = (float(positive) - probability) ** 2
+        bin_index = min(int(probability * self.bins), self.bins - 1)
+        entry = (weight, positive, log_loss, squared_loss, bin_index, probability)
+        self._add(entry, 1)
+        if self._history is not None:
+            self._history.append(entry)
+            if len(self._history) > self.window:
+                self._add(self._history.popleft(), -1)
+
+    def _add(self, entry, sign):
+        weight, positive, log_loss, squared_loss, bin_index, probability = entry
+        weight *= sign
+        self.count += sign
+        self.weight += weight
+        self.log_loss_sum += weight * log_loss
+        self.squared_loss_sum += weight * squared_loss
+        self.probability_sums[bin_index] += weight * probability
+        if positive:
+            self.positive_weight += weight
+            self.positive_counts[bin_index] += weight
+        else:
+            self.negative_counts[bin_index] += weight
+
+    @property
+    def log_loss(self):
+        if self.weight > 0:
+            return self.log_loss_sum / self.weight
+        return None
+
+    @property
+    def squared_loss(self):
+        """Mean squared difference between the predicted probability and
+        the 0/1 outcome (the Brier score)."""
+        if self.weight > 0:
+            return self.squared_loss_sum / self.weight
+        return None
+
+    @property
+    def auc(self):
+        """Area under the ROC curve, from the probability histogram
+        (ties within a bin count as half)."""
+        negative_weight = self.weight - self.positive_weight
+        if self.positive_weight <= 0 or negative_weight <= 0:
+            return None
+        area = 0.
+        positives_above = 0.
+        for bin_index in reversed(range(self.bins)):
+            positives = self.positive_counts[bin_index]
+            area += self.negative_counts[bin_index] * (positives_above + positives / 2.)
+            positives_above += positives
+        return area / (self.positive_weight * negative_weight)
+
+    @property
+    def calibration(self):
+        """Ratio of the mean predicted probability to the observed
+        positive rate (1.0 is perfectly calibrated on average)."""
+        if self.positive_weight <= 0:
+            return None
+        return sum(self.probability_sums) / self.positive_weight
+
+    def calibration_curve(self):
+        """Return a list of (mean predicted probability, observed positive
+        rate, weight) tuples, one per non-empty histogram bin."""
+        curve = []
+        for bin_index in range(self.bins):
+            weight = self.positive_counts[bin_index] + self.negative_counts[bin_index]
+            if weight > 0:
+                curve.append((self.probability_sums[bin_index] / weight,
+                              self.positive_counts[bin_index] / weight,
+                              weight))
+        return curve
+
+    def summary(self):
+        """Return a dict of all current metrics."""
+        return dict(count=self.count,
+                    log_loss=self.log_loss,
+                    squared_loss=self.squared_loss,
+                    auc=self.auc,
+                    calibration=self.calibration,
+                    )
+
+    def __str__(self):
+        return str(self.summary())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Vectorized parsing of multiclass (--oaa, --csoaa) raw predictions.
+
+With raw predictions sent to stdout, e.g.
+
+    VW(oaa=1000, predictions='/dev/null', raw_predictions='/dev/stdout')
+
+VW prints one 'label:score' pair per class for every example.  Rather than
+building a Python float per class (as VWResult does), these functions parse
+whole batches of output lines into a preallocated (n_examples, n_classes)
+NumPy matrix, with column j holding the score for label j + 1.
+
+Requires NumPy.
+"""
+
+import numpy as np
+
+
+def _clean(output):
+    """Return the 'label:score' part of a raw output line as text,
+    dropping any trailing tag."""
+    if isinstance(output, bytes):
+        output = output.decode('UTF-8')
+    head, _, last = output.rstrip().rpartition(' ')
+    if ':' not in last:
+        return head
+    return output
+
+
+def _parse_floats(text):
+    """Parse 'label:score label:score ...' text into a flat float array,
+    in C, without creating a Python object per value."""
+    return np.fromstring(text.replace(':', ' '), dtype=np.float64, sep=' ')
+
+
+def parse_scores(output, n_classes=None, out=None):
+    """Parse one raw output line into a row of scores.  Either 'n_classes'
+    or a preallocated row 'out' must be given.  Classes missing from the
+    output keep the value already in 'out' (NaN for a new row).
+    Returns the row."""
+    if out is None:
+        out = np.full(n_classes, np.nan)
+    pairs = _parse_floats(_clean(output))
+    labels = pairs[0::2].astype(np.intp)
+    out[labels - 1] = pairs[1::2]
+    return out
+
+
+def parse_score_matrix(outputs, n_classes, out=None):
+    """Parse an iterable of raw output lines into an (n_examples, n_classes)
+    score matrix, filling 'out' if given.  When every line lists the same
+    number of classes the whole batch is parsed in one pass."""
+    texts = [ _clean(output) if output is not None else None for output in outputs ]
+    if out is None:
+        out = np.full((len(texts), n_classes), np.nan)
+    if not texts:
+        return out
+    if None not in texts and len(set(text.count(':') for text in texts)) == 1:
+        pairs = _parse_floats(' '.join(texts)).reshape(len(texts), -1)
+        labels = pairs[:, 0::2].astype(np.intp) - 1
+        rows = np.arange(len(texts))[:, np.newaxis]
+        out[rows, labels] = pairs[:, 1::2]
+        return out
+    for row, text in enumerate(texts):  # Ragged batch, or lost responses
+        if text is not None:
+            parse_scores(text, out=out[row])
+    return out
+
+
+def top_k(scores, k, largest=True):
+    """Return a tuple (labels, scores) of (n_examples, k) arrays giving the
+    'k' best classes for each row of the score matrix 'scores', best first.
+    Labels are 1-based, as in VW.  For --csoaa, where the lowest cost wins,
+    set 'largest' to False."""
+    scores = np.asarray(scores)
+    if scores.ndim == 1:
+        scores = scores[np.newaxis, :]
+    keyed = -scores if largest else scores
+    keyed = np.where(np.isnan(keyed), np.inf, keyed)
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        candidates = np.argpartition(keyed, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    rows = np.arange(scores.shape[0])[:, np.newaxis]
+    order = np.argsort(keyed[rows, candidates], axis=1, kind='stable')
+    best = candidates[rows, order]
+    return best + 1, scores[rows, best]
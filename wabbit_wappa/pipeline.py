@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Bounded, back-pressured streaming pipelines feeding VW.
+
+A Pipeline chains a source iterable through stages (typically featurize,
+serialize, VW and a sink), each running in its own thread(s) and connected
+by bounded queues.  When a stage falls behind, its input queue fills and
+the stages upstream block, so memory use stays bounded by the buffer sizes
+rather than growing with the input.  CPU-heavy stages can run on several
+worker threads or processes.  Per-stage statistics (queue occupancy,
+throughput and busy time) show where the bottleneck is.
+
+    pipeline = Pipeline(read_records(), buffer_size=1000)
+    pipeline.featurize(make_example, workers=4, mode='process')
+    pipeline.serialize()
+    pipeline.vw(vw)
+    pipeline.sink(handle_result)
+    stats = pipeline.run()
+
+Note that stages with more than one worker may reorder items.
+"""
+
+import functools
+import multiprocessing
+import threading
+import time
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from . import VW, DEFAULT_CHUNK_SIZE
+
+
+DEFAULT_BUFFER_SIZE = 1000
+DEFAULT_PROCESS_CHUNK_SIZE = 64  # Items sent to a worker process at once
+POLL_SECONDS = 0.1  # How often blocked stages check whether the pipeline aborted
+
+_END = object()  # Marks the end of the stream
+
+_local = threading.local()  # Holds a line-making VW for each thread
+
+
+def serialize_example(example):
+    """Default serializer: turn a dict of VW.make_line() keyword arguments,
+    e.g. {'response': 1., 'features': ['a', 'b']}, into a VW example line."""
+    # make_line() collects namespaces on its VW instance while it builds a
+    # line, so worker threads mustn't share one
+    line_maker = getattr(_local, 'line_maker', None)
+    if line_maker is None:
+        line_maker = _local.line_maker = VW(dummy_mode=True)
+    return line_maker.make_line(**example)
+
+
+def _timed_call(func, item):
+    """Run 'func' on 'item' (in a worker process), returning the result
+    and the time it took."""
+    start_time = time.time()
+    result = func(item)
+    return result, time.time() - start_time
+
+
+class PipelineAborted(Exception):
+    pass
+
+
+class Stage():
+    """One step of a Pipeline, with its input queue and statistics."""
+    def __init__(self, name, func, workers=1, mode='thread', buffer_size=DEFAULT_BUFFER_SIZE,
+                 chunk_size=DEFAULT_PROCESS_CHUNK_SIZE):
+        """'func' maps each input item to an output item.  If it returns
+        None, the item is dropped.
+        'mode' is 'thread' or 'process' ('func' and its items must then be
+        picklable); 'workers' threads or processes run 'func' in parallel.
+        'buffer_size' bounds the stage's input queue.
+        In process mode, items are sent to the worker processes in chunks of
+        'chunk_size', to spread the cost of pickling and IPC.
+        """
+        if mode not in ('thread', 'process'):
+            raise ValueError("Unknown mode {}".format(mode))
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.input = queue.Queue(maxsize=buffer_size)
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.
+        self.occupancy_sum = 0.
+        self.start_time = None
+        self.end_time = None
+        self._lock = threading.Lock()
+        self._finished_workers = 0
+
+    def record(self, items_in, items_out, busy_seconds):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.busy_seconds += busy_seconds
+            self.occupancy_sum += items_in * self.input.qsize() / self.input.maxsize
+
+    def stats(self):
+        """Return a dict of statistics for this stage."""
+        elapsed = (self.end_time or time.time()) - (self.start_time or time.time())
+        result = dict(name=self.name,
+                      items_in=self.items_in,
+                      items_out=self.items_out,
+                      workers=self.workers,
+                      busy_seconds=self.busy_seconds,
+                      occupancy=self.input.qsize() / self.input.maxsize,
+                      )
+        if self.items_in:
+            result['mean_occupancy'] = self.occupancy_sum / self.items_in
+        if elapsed > 0:
+            result['items_per_second'] = self.items_out / elapsed
+            result['utilization'] = self.busy_seconds / (elapsed * self.workers)
+        return result
+
+
+class VWStage(Stage):
+    """Stage sending serialized lines to a VW instance, a chunk at a time."""
+    def __init__(self, vw, parse_result=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                 buffer_size=DEFAULT_BUFFER_SIZE):
+        Stage.__init__(self, 'vw', None, buffer_size=buffer_size)
+        self.vw = vw
+        self.parse_result = parse_result
+        self.chunk_size = chunk_size
+
+
+class Pipeline():
+    """Chain of bounded stages between a source iterable and a sink."""
+    def __init__(self, source, buffer_size=DEFAULT_BUFFER_SIZE):
+        """'source' is an iterable of input items.  'buffer_size' is the
+        default bound on each stage's input queue."""
+        self.source = source
+        self.buffer_size = buffer_size
+        self.stages = []
+        self.sink_func = None
+        self.source_items = 0
+        self._abort = threading.Event()
+        self._errors = []
+
+    def add_stage(self, name, func, workers=1, mode='thread', buffer_size=None,
+                  chunk_size=DEFAULT_PROCESS_CHUNK_SIZE):
+        """Append a stage applying 'func' to each item (see Stage).
+        Returns self (so that this command can be chained)."""
+        self.stages.append(Stage(name, func, workers, mode, buffer_size or self.buffer_size,
+                                 chunk_size))
+        return self
+
+    def featurize(self, func, workers=1, mode='thread', buffer_size=None,
+                  chunk_size=DEFAULT_PROCESS_CHUNK_SIZE):
+        """Append a featurization stage.  Returns self."""
+        return self.add_stage('featurize', func, workers, mode, buffer_size, chunk_size)
+
+    def serialize(self, func=serialize_example, workers=1, mode='thread', buffer_size=None,
+                  chunk_size=DEFAULT_PROCESS_CHUNK_SIZE):
+        """Append a stage turning items into VW lines; by default, items are
+        dicts of VW.make_line() arguments.  Returns self."""
+        return self.add_stage('serialize', func, workers, mode, buffer_size, chunk_size)
+
+    def vw(self, vw, parse_result=True, chunk_size=DEFAULT_CHUNK_SIZE, buffer_size=None):
+        """Append a stage sending lines to the VW instance 'vw', producing a
+        VWResult for each (or None if not 'parse_result').  Returns self."""
+        self.stages.append(VWStage(vw, parse_result, chunk_size, buffer_size or self.buffer_size))
+        return self
+
+    def sink(self, func):
+        """Call 'func' on every item leaving the last stage.  Returns self."""
+        self.sink_func = func
+        return self
+
+    def _put(self, target_queue, item):
+        while True:
+            if self._abort.is_set():
+                raise PipelineAborted()
+            try:
+                target_queue.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, source_queue):
+        while True:
+            if self._abort.is_set():
+                raise PipelineAborted()
+            try:
+                return source_queue.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                pass
+
+    def _run_source(self, output_queue):
+        for item in self.source:
+            self._put(output_queue, item)
+            self.source_items += 1
+        self._put(output_queue, _END)
+
+    def _run_worker(self, stage, output_queue):
+        while True:
+            item = self._get(stage.input)
+            if item is _END:
+                self._put(stage.input, _END)  # Let sibling workers see it too
+                with stage._lock:
+                    stage._finished_workers += 1
+                    last = stage._finished_workers == stage.workers
+                if last:
+                    stage.end_time = time.time()
+                    self._put(output_queue, _END)
+                return
+            start_time = time.time()
+            result = stage.func(item)
+            stage.record(1, int(result is not None), time.time() - start_time)
+            if result is not None:
+                self._put(output_queue, result)
+
+    def _wait(self, async_result):
+        """Return the results of a pool's map_async() call, unless the
+        pipeline aborts first."""
+        while True:
+            if self._abort.is_set():
+                raise PipelineAborted()
+            try:
+                return async_result.get(POLL_SECONDS)
+            except multiprocessing.TimeoutError:
+                pass
+
+    def _run_process_stage(self, stage, output_queue, pool):
+        """Feed a process-mode stage's items to 'pool' in batches, keeping
+        one batch in flight while the results of the previous one are
+        passed on."""
+        func = functools.partial(_timed_call, stage.func)
+        batch_size = stage.workers * stage.chunk_size
+        pending = None
+        done = False
+        while not done:
+            batch = [self._get(stage.input)]
+            while len(batch) < batch_size and batch[-1] is not _END:
+                try:
+                    batch.append(stage.input.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _END:
+                batch.pop()
+                done = True
+            submitted = None
+            if batch:
+                submitted = pool.map_async(func, batch, chunksize=stage.chunk_size)
+            if pending is not None:
+                self._emit_batch(stage, output_queue, self._wait(pending))
+            pending = submitted
+        if pending is not None:
+            self._emit_batch(stage, output_queue, self._wait(pending))
+        stage.end_time = time.time()
+        self._put(output_queue, _END)
+
+    def _emit_batch(self, stage, output_queue, timed_results):
+        results = [ result for result, seconds in timed_results if result is not None ]
+        stage.record(len(timed_results), len(results),
+                     sum(seconds for result, seconds in timed_results))
+        for result in results:
+            self._put(output_queue, result)
+
+    def _run_vw(self, stage, output_queue):
+        done = False
+        while not done:
+            chunk = [self._get(stage.input)]
+            while len(chunk) < stage.chunk_size and chunk[-1] is not _END:
+                try:
+                    chunk.append(stage.input.get_nowait())
+                except queue.Empty:
+                    break
+            if chunk[-1] is _END:
+                chunk.pop()
+                done = True
+            start_time = time.time()
+            results = stage.vw.send_lines(chunk, parse_result=stage.parse_result)
+            stage.record(len(chunk), len(chunk), time.time() - start_time)
+            if results is None:
+                results = [None] * len(chunk)
+            for result in results:
+                self._put(output_queue, result)
+        stage.end_time = time.time()
+        self._put(output_queue, _END)
+
+    def _run_sink(self, input_queue):
+        while True:
+            item = self._get(input_queue)
+            if item is _END:
+                return
+            if self.sink_func is not None:
+                self.sink_func(item)
+
+    def _guard(self, target, *args):
+        """Run 'target', stopping the whole pipeline if it fails."""
+        try:
+            target(*args)
+        except PipelineAborted:
+            pass
+        except Exception as error:
+            self._errors.append(error)
+            self._abort.set()
+
+    def run(self):
+        """Run the pipeline until the source is exhausted and every item has
+        reached the sink.  Re-raises the first exception from any stage.
+        Returns the list of per-stage statistics."""
+        sink_queue = queue.Queue(maxsize=self.buffer_size)
+        queues = [ stage.input for stage in self.stages ] + [sink_queue]
+        threads = [ threading.Thread(target=self._guard, args=(self._run_source, queues[0])) ]
+        pools = []
+        for stage, output_queue in zip(self.stages, queues[1:]):
+            stage.start_time = time.time()
+            if isinstance(stage, VWStage):
+                threads.append(threading.Thread(target=self._guard,
+                                                args=(self._run_vw, stage, output_queue)))
+                continue
+            if stage.mode == 'process':
+                pool = multiprocessing.Pool(stage.workers)
+                pools.append(pool)
+                threads.append(threading.Thread(target=self._guard,
+                                                args=(self._run_process_stage, stage,
+                                                      output_queue, pool)))
+                continue
+            for i in range(stage.workers):
+                threads.append(threading.Thread(target=self._guard,
+                                                args=(self._run_worker, stage, output_queue)))
+        threads.append(threading.Thread(target=self._guard, args=(self._run_sink, sink_queue)))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(POLL_SECONDS)
+        except KeyboardInterrupt:
+            self._abort.set()
+            raise
+        finally:
+            for pool in pools:
+                pool.terminate()
+        if self._errors:
+            raise self._errors[0]
+        return self.stats()
+
+    def stats(self):
+        """Return a list of statistics dicts, one per stage."""
+        return [ stage.stats() for stage in self.stages ]
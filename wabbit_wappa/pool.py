@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Warm pool of pre-spawned VW processes.
+
+Starting a VW process (fork, exec, allocating the weight table) costs far more
+than a typical example.  Programs that create many short-lived learners can
+pre-spawn processes for the argument lists they will use, and hand the pool
+to VW():
+
+    pool = VWProcessPool(size=4)
+    pool.prespawn(make_command_args(loss_function='logistic'))
+    vw = VW(loss_function='logistic', process_pool=pool)  # Takes a ready process
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from . import spawn_vw_process
+
+
+def _is_option(arg):
+    if not arg.startswith('-'):
+        return False
+    try:
+        float(arg)  # A negative number is a value, not an option
+    except ValueError:
+        return True
+    return False
+
+
+def pool_key(command_args):
+    """Return a key identifying VW processes started with 'command_args'
+    regardless of the order of its options: the executable, followed by
+    the sorted (option, values...) groups."""
+    groups = []
+    for arg in command_args[1:]:
+        if _is_option(arg) or not groups:
+            groups.append([arg])
+        else:
+            groups[-1].append(arg)
+    return (command_args[0],) + tuple(sorted(tuple(group) for group in groups))
+
+
+class VWProcessPool():
+    """Idle VW processes keyed by their options (see pool_key())."""
+    def __init__(self, size=1, refill=True):
+        """'size' is the number of idle processes kept ready for each
+        argument list.  If 'refill', a replacement is spawned in a background
+        thread whenever a process is taken from the pool."""
+        self.size = size
+        self.refill = refill
+        self._idle = collections.defaultdict(list)
+        self._starting = collections.Counter()  # Processes being spawned for the pool
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.spawn_seconds = []  # Time taken to start each process
+        self.acquire_seconds = []  # Time taken by each acquire() call
+
+    def _spawn(self, command_args):
+        start_time = time.time()
+        vw_process = spawn_vw_process(command_args)
+        duration = time.time() - start_time
+        with self._lock:
+            self.spawn_seconds.append(duration)
+        return vw_process
+
+    def prespawn(self, command_args, count=None):
+        """Start processes for 'command_args' until 'count' (default: the
+        pool size) are idle and ready."""
+        key = pool_key(command_args)
+        if count is None:
+            count = self.size
+        while True:
+            with self._lock:
+                # Reserve a slot first, so that concurrent refills don't overfill the pool
+                if len(self._idle[key]) + self._starting[key] >= count:
+                    break
+                self._starting[key] += 1
+            vw_process = None
+            try:
+                vw_process = self._spawn(command_args)
+            finally:
+                with self._lock:
+                    self._starting[key] -= 1
+                    if vw_process is not None:
+                        self._idle[key].append(vw_process)
+
+    def acquire(self, command_args):
+        """Return a running VW process for 'command_args', taking an idle one
+        if available and spawning a new one otherwise."""
+        start_time = time.time()
+        key = pool_key(command_args)
+        vw_process = None
+        with self._lock:
+            idle = self._idle[key]
+            while idle and vw_process is None:
+                candidate = idle.pop()
+                if candidate.isalive():
+                    vw_process = candidate
+                else:
+                    logging.warning("Discarding dead pooled VW process {}".format(candidate.pid))
+        if vw_process is not None:
+            with self._lock:
+                self.hits += 1
+            if self.refill:
+                thread = threading.Thread(target=self.prespawn, args=(list(command_args),))
+                thread.daemon = True
+                thread.start()
+        else:
+            with self._lock:
+                self.misses += 1
+            vw_process = self._spawn(command_args)
+        with self._lock:
+            self.acquire_seconds.append(time.time() - start_time)
+        return vw_process
+
+    def stats(self):
+        """Return a dict of pool usage and startup latency measurements."""
+        def mean(values):
+            if values:
+                return sum(values) / len(values)
+            else:
+                return None
+        with self._lock:
+            idle_count = sum(len(processes) for processes in self._idle.values())
+            result = dict(hits=self.hits,
+                          misses=self.misses,
+                          idle=idle_count,
+                          spawned=len(self.spawn_seconds),
+                          mean_spawn_seconds=mean(self.spawn_seconds),
+                          mean_acquire_seconds=mean(self.acquire_seconds),
+                          )
+        return result
+
+    def close(self):
+        """Shut down all idle processes."""
+        with self._lock:
+            for processes in self._idle.values():
+                for vw_process in processes:
+                    vw_process.close()
+            self._idle.clear()
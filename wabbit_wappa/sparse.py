@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Conversion of scipy.sparse matrices, NumPy arrays and pandas DataFrames
+into VW example lines, a chunk of rows at a time.
+
+Rather than building a Namespace per row, the CSR 'indptr'/'indices'/'data'
+arrays of each chunk are turned into feature tokens with vectorized string
+operations against a precomputed table of (escaped) column names.
+
+Requires NumPy and SciPy.
+"""
+
+import numpy as np
+import scipy.sparse
+
+from . import escape_vw_string
+
+
+DEFAULT_ROWS_PER_CHUNK = 1024
+
+
+def to_csr(X, column_names=None):
+    """Convert 'X' (a scipy.sparse matrix, a 2-D array or a pandas DataFrame)
+    to CSR format.  Returns a tuple (csr_matrix, column_names), where
+    column_names defaults to a DataFrame's columns, and otherwise to the
+    column indices."""
+    if column_names is None and hasattr(X, 'columns'):
+        column_names = [ str(column) for column in X.columns ]
+    if hasattr(X, 'sparse') and hasattr(X.sparse, 'to_coo'):  # Sparse DataFrame
+        X = X.sparse.to_coo()
+    elif hasattr(X, 'to_numpy'):  # Dense DataFrame
+        X = X.to_numpy()
+    X = scipy.sparse.csr_matrix(X)
+    if column_names is None:
+        column_names = [ str(i) for i in range(X.shape[1]) ]
+    if len(column_names) != X.shape[1]:
+        raise ValueError("Got {} column names for {} columns".format(len(column_names),
+                                                                     X.shape[1]))
+    return X, column_names
+
+
+class SparseLineFormatter():
+    """Formats chunks of CSR rows as VW example lines."""
+    def __init__(self, column_names, namespace_map=None, escape=True):
+        """'column_names' gives the VW feature name for each column.
+        'namespace_map' is an optional dict mapping a namespace name to the
+        columns (given by index or by name) whose features go in that
+        namespace.  Any columns not mapped go in the default namespace.
+        If 'escape', characters reserved by VW are escaped in all names.
+        """
+        column_index = dict((name, i) for i, name in enumerate(column_names))
+        if escape:
+            column_names = [ escape_vw_string(name) for name in column_names ]
+        names = np.array(column_names, dtype=np.str_)
+        unmapped = np.ones(len(column_names), dtype=bool)
+        self.namespaces = []  # List of (prefix, column indices, column names)
+        for name, columns in sorted((namespace_map or {}).items()):
+            columns = np.array([ column_index.get(column, column) for column in columns ],
+                               dtype=np.intp)
+            unmapped[columns] = False
+            if escape:
+                name = escape_vw_string(name)
+            self.namespaces.append(('|' + name + ' ', columns, names[columns]))
+        if unmapped.any():
+            columns = np.flatnonzero(unmapped)
+            self.namespaces.insert(0, ('| ', columns, names[columns]))
+
+    def _namespace_strings(self, X_chunk, prefix, columns, names):
+        """Return the namespace substring for each row of 'X_chunk'
+        ('' for rows with no features in this namespace)."""
+        if not (len(columns) == X_chunk.shape[1] and (columns == np.arange(len(columns))).all()):
+            X_chunk = X_chunk[:, columns]  # Columns in the order of 'names'
+        values = X_chunk.data.astype(np.str_)
+        tokens = np.char.add(np.char.add(names[X_chunk.indices], ':'), values).tolist()
+        indptr = X_chunk.indptr.tolist()
+        strings = []
+        for start, end in zip(indptr[:-1], indptr[1:]):
+            if end > start:
+                strings.append(prefix + ' '.join(tokens[start:end]) + ' ')
+            else:
+                strings.append('')
+        return strings
+
+    def format_chunk(self, X_chunk, labels=None, importances=None):
+        """Return a list of VW example lines, one per row of the CSR matrix
+        'X_chunk'.  'labels' and 'importances', if given, are sequences
+        with one entry per row."""
+        X_chunk.sort_indices()
+        namespace_strings = [ self._namespace_strings(X_chunk, prefix, columns, names)
+                              for prefix, columns, names in self.namespaces ]
+        if labels is None:
+            heads = [''] * X_chunk.shape[0]
+        elif importances is None:
+            heads = [ '{} '.format(label) for label in labels ]
+        else:
+            heads = [ '{} {} '.format(label, importance)
+                      for label, importance in zip(labels, importances) ]
+        lines = []
+        for head, parts in zip(heads, zip(*namespace_strings)):
+            body = ''.join(parts)
+            lines.append(head + (body or '|'))
+        return lines
+
+
+def iter_sparse_lines(X,
+                      y=None,
+                      sample_weight=None,
+                      namespace_map=None,
+                      column_names=None,
+                      chunk_size=DEFAULT_ROWS_PER_CHUNK):
+    """Generate VW example lines for each row of 'X', labeled with 'y'
+    (and importance weights 'sample_weight') if given.
+    See SparseLineFormatter for 'namespace_map' and to_csr() for
+    'column_names'.  Rows are formatted 'chunk_size' at a time.
+    """
+    X, column_names = to_csr(X, column_names)
+    formatter = SparseLineFormatter(column_names, namespace_map=namespace_map)
+    if y is not None:
+        y = np.asarray(y).tolist()
+    if sample_weight is not None:
+        sample_weight = np.asarray(sample_weight).tolist()
+    for start in range(0, X.shape[0], chunk_size):
+        end = start + chunk_size
+        labels = y[start:end] if y is not None else None
+        importances = sample_weight[start:end] if sample_weight is not None else None
+        for line in formatter.format_chunk(X[start:end], labels, importances):
+            yield line
+
+
+def predictions_to_array(outputs):
+    """Convert an iterable of raw VW output lines to a NumPy array of
+    their first (prediction) values.  Lost responses (None) become NaN."""
+    return np.array([ float(output.split(None, 1)[0]) if output is not None else np.nan
+                      for output in outputs ],
+                    dtype=np.float64)
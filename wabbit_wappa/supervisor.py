@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+"""
+Resource governance for VW subprocesses on shared hosts.
+
+A VWSupervisor spawns VW instances and, for each child process:
+-estimates its memory footprint from -b before spawning, refusing to start
+    one that cannot fit under the RSS limit
+-pins it to a set of CPUs and caps its address space with an rlimit
+    (optional), both set in the child before VW is executed, so that they
+    apply to all of VW's threads and allocations
+-tracks its CPU time and resident memory from /proc, restarting it if
+    it grows past the RSS limit
+-kills and restarts it if it doesn't respond within 'response_timeout'
+    seconds, resuming from the latest checkpoint if the VW instance has a
+    checkpoint.Checkpointer
+
+Linux only.
+"""
+
+import logging
+import os
+import shlex
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from . import VW, basestring, make_command_args, spawn_vw_process
+
+
+DEFAULT_BITS = 18
+DEFAULT_OVERHEAD_BYTES = 16 << 20  # Rough size of VW's code, buffers and parser state
+DEFAULT_RESPONSE_TIMEOUT = 30.
+
+
+class WabbitResourceError(RuntimeError):
+    pass
+
+
+class WabbitProcessHung(RuntimeError):
+    """Raised when a supervised VW process failed to respond in time.
+    By the time this is raised, the process has been restarted; the
+    response to the line being read is lost."""
+    pass
+
+
+def _next_power_of_two(n):
+    power = 1
+    while power < n:
+        power <<= 1
+    return power
+
+
+def estimate_memory(b=DEFAULT_BITS, sgd=False, oaa=None, csoaa=None,
+                    overhead=DEFAULT_OVERHEAD_BYTES, **kwargs):
+    """Estimate the resident memory, in bytes, of a VW process started with
+    these make_command_args() options.  The weight table holds 2**b entries
+    for each reduction problem, of 4-byte floats times the stride (4 with
+    VW's default adaptive, normalized updates; 1 with --sgd)."""
+    stride = 1 if sgd else 4
+    problems = _next_power_of_two(int(oaa or csoaa or 1))
+    return (1 << int(b)) * problems * stride * 4 + overhead
+
+
+def command_options(command):
+    """Return a dict of the estimate_memory() options given in the VW
+    'command' (a command line string or an argument list)."""
+    if isinstance(command, basestring):
+        command = shlex.split(command)
+    names = {'-b': 'b', '--bit_precision': 'b', '--oaa': 'oaa', '--csoaa': 'csoaa'}
+    options = {}
+    arguments = iter(command)
+    for argument in arguments:
+        name, equals, value = argument.partition('=')
+        if name == '--sgd':
+            options['sgd'] = True
+        elif name in names:
+            if not equals:
+                value = next(arguments, None)
+            if value is not None:
+                options[names[name]] = value
+    return options
+
+
+def read_proc_usage(pid):
+    """Return a dict with the resident memory ('rss_bytes') and total CPU
+    time ('cpu_seconds') of process 'pid', read from /proc."""
+    rss_bytes = None
+    with open('/proc/{}/status'.format(pid)) as status_file:
+        for line in status_file:
+            if line.startswith('VmRSS:'):
+                rss_bytes = int(line.split()[1]) * 1024
+                break
+    with open('/proc/{}/stat'.format(pid)) as stat_file:
+        stat = stat_file.read()
+    # Fields after the parenthesized command name; utime and stime are 14 and 15
+    fields = stat[stat.rindex(')') + 2:].split()
+    ticks = os.sysconf(os.sysconf_names['SC_CLK_TCK'])
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / ticks
+    return dict(rss_bytes=rss_bytes, cpu_seconds=cpu_seconds)
+
+
+def _process_of(vw):
+    """Return the pexpect process object of the VW executable itself."""
+    vw_process = vw.vw_process
+    return getattr(vw_process, 'vw_process', vw_process)  # Active mode wraps it
+
+
+class VWSupervisor():
+    """Spawns and polices VW processes."""
+    def __init__(self,
+                 cpus=None,
+                 max_rss_bytes=None,
+                 address_space_bytes=None,
+                 response_timeout=DEFAULT_RESPONSE_TIMEOUT):
+        """'cpus' is a set of CPU numbers to pin every child to.
+        'max_rss_bytes' is the resident memory limit for each child.
+        'address_space_bytes' sets RLIMIT_AS for each child (VW maps more
+            virtual memory than it uses, so this should be generous).
+        'response_timeout' is the number of seconds to wait for a response
+            before declaring a child hung.
+        """
+        self.cpus = set(cpus) if cpus is not None else None
+        self.max_rss_bytes = max_rss_bytes
+        self.address_space_bytes = address_space_bytes
+        self.response_timeout = response_timeout
+        self.children = []
+        self.restarts = 0
+        self._last_samples = {}  # pid -> (time, cpu_seconds)
+        self._lock = threading.Lock()
+        self._monitor_thread = None
+        self._stop_monitoring = threading.Event()
+        if self.cpus is not None and not hasattr(os, 'sched_setaffinity'):
+            logging.warning("CPU affinity is not supported on this platform")
+        if address_space_bytes is not None and resource is None:
+            logging.warning("rlimits are not supported on this platform")
+
+    def _preexec_fn(self):
+        """Return a function applying the CPU affinity and rlimit in a
+        child process before VW is executed (or None if there are none)."""
+        cpus = self.cpus if hasattr(os, 'sched_setaffinity') else None
+        address_space_bytes = self.address_space_bytes if resource is not None else None
+        if cpus is None and address_space_bytes is None:
+            return None
+
+        def preexec_fn():
+            if cpus is not None:
+                os.sched_setaffinity(0, cpus)
+            if address_space_bytes is not None:
+                resource.setrlimit(resource.RLIMIT_AS, (address_space_bytes, address_space_bytes))
+        return preexec_fn
+
+    def spawn(self, **kwargs):
+        """Start a supervised VW instance, passing 'kwargs' to VW().
+        Raises WabbitResourceError if its estimated memory exceeds
+        max_rss_bytes."""
+        if kwargs.get('process_pool') is not None:
+            raise ValueError("Supervised VW processes can't be taken from a process pool")
+        if kwargs.get('command') is not None:
+            command = kwargs['command']
+        else:
+            # Read the options back from their command line, so that both
+            # ways of giving them (e.g. b=30 or bit_precision=30) agree
+            vw_options = dict(kwargs)
+            for key in ('active_mode', 'dummy_mode', 'process_pool', 'metrics',
+                        'sequence_tags', 'resync_timeout', 'preexec_fn', 'audit_index',
+                        'command'):
+                vw_options.pop(key, None)
+            command = make_command_args(**vw_options)
+        estimate = estimate_memory(**command_options(command))
+        if self.max_rss_bytes is not None and estimate > self.max_rss_bytes:
+            raise WabbitResourceError("VW with these options needs about {} bytes, over the "
+                                      "limit of {}".format(estimate, self.max_rss_bytes))
+        vw = VW(preexec_fn=self._preexec_fn(), **kwargs)
+        vw.supervisor = self
+        vw.process_lock = threading.RLock()
+        _process_of(vw).timeout = self.response_timeout
+        with self._lock:
+            self.children.append(vw)
+        return vw
+
+    def release(self, vw):
+        """Stop supervising 'vw' (called when it is closed)."""
+        with self._lock:
+            if vw in self.children:
+                self.children.remove(vw)
+        self._last_samples.pop(_process_of(vw).pid, None)
+
+    def restart(self, vw):
+        """Kill the process of 'vw' and start a new one with the same
+        options, loading the latest checkpoint if there is one."""
+        if vw.active_mode:
+            raise WabbitResourceError("Active mode VW processes can't be restarted")
+        with vw.process_lock:
+            old_process = vw.vw_process
+            try:
+                old_process.terminate(force=True)
+            except Exception:
+                logging.exception("Could not kill VW process {}".format(old_process.pid))
+            command_args = list(vw.command_args)
+            checkpoint = vw.checkpointer.latest() if vw.checkpointer is not None else None
+            if checkpoint is not None:
+                if '-i' in command_args:
+                    position = command_args.index('-i')
+                    del command_args[position:position + 2]
+                command_args.extend(['-i', checkpoint])
+            vw.vw_process = spawn_vw_process(command_args, preexec_fn=self._preexec_fn())
+            vw.vw_process.timeout = self.response_timeout
+            if vw.checkpointer is not None:
+                vw.checkpointer.process_restarted()
+        self._last_samples.pop(old_process.pid, None)
+        self.restarts += 1
+        logging.warning("Restarted VW process {} as {} (from checkpoint {})".format(
+            old_process.pid, vw.vw_process.pid, checkpoint))
+
+    def handle_timeout(self, vw):
+        """Called by a supervised VW instance when a response times out:
+        restart its process and raise WabbitProcessHung."""
+        pid = _process_of(vw).pid
+        self.restart(vw)
+        raise WabbitProcessHung("VW process {} gave no response within {} seconds; "
+                                "restarted".format(pid, self.response_timeout))
+
+    def usage(self, vw):
+        """Return a dict of resource usage for the process of 'vw', including
+        'cpu_percent' since the previous sample."""
+        pid = _process_of(vw).pid
+        result = read_proc_usage(pid)
+        now = time.time()
+        last = self._last_samples.get(pid)
+        if last is not None and now > last[0]:
+            result['cpu_percent'] = 100. * (result['cpu_seconds'] - last[1]) / (now - last[0])
+        self._last_samples[pid] = (now, result['cpu_seconds'])
+        result['pid'] = pid
+        if hasattr(os, 'sched_getaffinity'):
+            result['cpus'] = os.sched_getaffinity(pid)
+        return result
+
+    def check(self):
+        """Sample every child's usage, restarting any child over the RSS
+        limit or no longer running.  Returns a list of usage dicts."""
+        with self._lock:
+            children = list(self.children)
+        usages = []
+        for vw in children:
+            # Wait for any exchange with VW in progress to finish
+            with vw.process_lock:
+                with self._lock:
+                    if vw not in self.children:  # Closed meanwhile
+                        continue
+                if not _process_of(vw).isalive():
+                    logging.warning("VW process {} died".format(_process_of(vw).pid))
+                    self.restart(vw)
+                usage = self.usage(vw)
+                if self.max_rss_bytes is not None and usage['rss_bytes'] > self.max_rss_bytes:
+                    logging.warning("VW process {} is using {} bytes, over the limit of {}".format(
+                        usage['pid'], usage['rss_bytes'], self.max_rss_bytes))
+                    self.restart(vw)
+                    usage['restarted'] = True
+            usages.append(usage)
+        return usages
+
+    def start_monitoring(self, interval=1.):
+        """Call check() every 'interval' seconds in a background thread."""
+        def monitor():
+            while not self._stop_monitoring.wait(interval):
+                try:
+                    self.check()
+                except Exception:
+                    logging.exception("Error while checking VW processes")
+        self._stop_monitoring.clear()
+        self._monitor_thread = threading.Thread(target=monitor)
+        self._monitor_thread.daemon = True
+        self._monitor_thread.start()
+
+    def stop_monitoring(self):
+        self._stop_monitoring.set()
+        if self._monitor_thread is not None:
+            self._monitor_thread.join()
+            self._monitor_thread = None
+
+    def close(self):
+        """Stop monitoring and shut down every child."""
+        self.stop_monitoring()
+        with self._lock:
+            children, self.children = self.children, []
+        for vw in children:
+            vw.close()